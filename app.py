@@ -2,7 +2,18 @@ import streamlit as st
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from scipy.optimize import minimize
+from engine import DATA_FULL, HLD_T_REF, evaluate_cached
+from optimizer import optimize_formulation, optimize_constrained, multistart
+from pareto import pareto_front
+from screening import screen_all
+import jobs
+from clp import classify_formulation
+from phase_map import salinity_eacn_map, salinity_temperature_map
+from ternary import REGIONS, pseudo_ternary, triangle_regions
+from sensitivity import SOBOL_OUTPUTS, sensitivity
+from uncertainty import DISTRIBUTIONS, HLD_WINDOW, MC_SAMPLES, UNCERTAINTY, monte_carlo
+from planner import parse_vessels, plan_production
+from plots import APP_LOD, LOD, hansen_figure, set_current_point
 
 # --- 1. TRANSLATION DATA ---
 LANGS = {
@@ -55,10 +66,38 @@ LANGS = {
         "opt_wait": "Calculating optimal ratios...",
         "opt_succ": "Optimized! Set Oil: ",
         "opt_err": "Could not converge. Try different baseline.",
+        "opt_mode": "Optimizer mode",
+        "opt_modes": ["Local", "Multistart (global search)", "Exact mass balance (all phases)"],
+        "pareto_btn": "📈 Trade-off Front: RED / HLD / Cost / Flash Point",
+        "screen_btn": "🔎 Screen All Component Combinations",
+        "job_best": "Best so far",
+        "cancel_btn": "Cancel",
+        "job_cancelled": "Job cancelled.",
         "red_help": "Relative Energy Difference. RED < 1: Soluble (Inside sphere). RED > 1: Insoluble (Outside sphere).",
         "hld_help": "Hydrophilic-Lipophilic Difference. Balances surfactant-oil-water affinity. Stability range: -0.5 to +0.5.",
+        "unc_mode": "🎲 Uncertainty mode (Monte Carlo)",
+        "unc_spec": "Parameter uncertainty",
+        "unc_dist": "Distribution",
+        "unc_params": {"hsp": "HSP components (MPa½)", "res_hsp": "Resin HSP (MPa½)", "r0": "Resin R0 (MPa½)",
+                       "eacn": "EACN", "cc": "Surfactant Cc", "rho": "Density (rel.)", "fp": "Flash point (°C)",
+                       "weighing": "Weighing (rel.)", "salinity": "Salinity (rel.)"},
+        "ci": "95% CI",
+        "p_stable": "P(|HLD| < 0.5)",
+        "p_soluble": "P(RED < 1)",
+        "p_ok": "P(stable and soluble)",
+        "sobol_mode": "🎯 Sensitivity analysis (Sobol indices)",
+        "sobol_caption": "Total-effect index ST: share of the output variance driven by each input, interactions included (hover: first-order S1).",
+        "cc": "Surfactant Cc", "eacn": "Solvent EACN",
+        "pmap_mode": "🗺️ HLD phase maps (Winsor scan)",
+        "pmap_kinds": ["Salinity × Temperature", "Salinity × Oil EACN"],
+        "temp": "Temperature (°C)", "oil_eacn": "Oil EACN", "optimum": "HLD = 0",
+        "tern_mode": "🔺 Pseudo-ternary diagram (oil / water / S-mix)",
+        "tern_props": ["Stability (|HLD|)", "Solubility (RED)", "Flammability (CLP)"],
+        "tern_evals": "model evaluations (adaptive mesh)",
+        "lod": "3D detail level", "lod_names": {"low": "Low", "medium": "Medium", "high": "High"},
         "reg_title": "Regulatory Compliance & GHS",
         "h_phrases": "⚠️ Hazard Statements (H-Phrases)",
+        "signal": "Signal word", "signal_words": {"Danger": "Danger", "Warning": "Warning"},
         "p_phrases": "🛡️ Precautionary Statements (P-Phrases)",
         "flam_title": "🔥 CLP/ECHA Flammability Classification",
         "calc_fp": "Calculated FP",
@@ -83,6 +122,9 @@ LANGS = {
         "tip": "💡 **Mixing Tip:** Blend organic phase (Steps 1-4) first, then slowly add aqueous phase (Step 5) under high shear.",
         "report_title": "📄 Report Generation",
         "tds_btn": "📥 Download Technical Data Sheet (TXT)",
+        "plan_title": "🗓️ Production Planner (multiple lots)",
+        "plan_upload": "Schedule CSV (lot, resin, solvent, cosolvent, surfactant, cosurfactant, aqueous, p_sol … salinity, volume_l, due)",
+        "plan_vessels": "Vessels (name:litres, comma separated)",
         "ref_data": "📚 Scientific Reference Data",
         "origin": "Origin",
         "code": "Code",
@@ -139,10 +181,38 @@ LANGS = {
         "opt_wait": "Calculando proporciones óptimas...",
         "opt_succ": "¡Optimizado! Solvente: ",
         "opt_err": "No convergió. Pruebe otro punto de inicio.",
+        "opt_mode": "Modo del optimizador",
+        "opt_modes": ["Local", "Multiarranque (búsqueda global)", "Balance de masa exacto (todas las fases)"],
+        "pareto_btn": "📈 Frente de Compromiso: RED / HLD / Coste / Punto de Inflamación",
+        "screen_btn": "🔎 Cribado de Todas las Combinaciones",
+        "job_best": "Mejor hasta ahora",
+        "cancel_btn": "Cancelar",
+        "job_cancelled": "Trabajo cancelado.",
         "red_help": "Diferencia de Energía Relativa. RED < 1: Soluble (Dentro de la esfera). RED > 1: Insoluble (Fuera).",
         "hld_help": "Diferencia Hidrófila-Lipófila. Equilibra la afinidad del tensioactivo. Rango estable: -0.5 a +0.5.",
+        "unc_mode": "🎲 Modo incertidumbre (Monte Carlo)",
+        "unc_spec": "Incertidumbre de los parámetros",
+        "unc_dist": "Distribución",
+        "unc_params": {"hsp": "HSP de componentes (MPa½)", "res_hsp": "HSP de la resina (MPa½)", "r0": "R0 de la resina (MPa½)",
+                       "eacn": "EACN", "cc": "Cc del tensioactivo", "rho": "Densidad (rel.)", "fp": "Punto de inflamación (°C)",
+                       "weighing": "Pesada (rel.)", "salinity": "Salinidad (rel.)"},
+        "ci": "IC 95%",
+        "p_stable": "P(|HLD| < 0,5)",
+        "p_soluble": "P(RED < 1)",
+        "p_ok": "P(estable y soluble)",
+        "sobol_mode": "🎯 Análisis de sensibilidad (índices de Sobol)",
+        "sobol_caption": "Índice total ST: fracción de la varianza de la salida debida a cada entrada, interacciones incluidas (al pasar el ratón: S1 de primer orden).",
+        "cc": "Cc del tensioactivo", "eacn": "EACN del solvente",
+        "pmap_mode": "🗺️ Mapas de fase HLD (barrido Winsor)",
+        "pmap_kinds": ["Salinidad × Temperatura", "Salinidad × EACN del aceite"],
+        "temp": "Temperatura (°C)", "oil_eacn": "EACN del aceite", "optimum": "HLD = 0",
+        "tern_mode": "🔺 Diagrama pseudoternario (aceite / agua / S-mix)",
+        "tern_props": ["Estabilidad (|HLD|)", "Solubilidad (RED)", "Inflamabilidad (CLP)"],
+        "tern_evals": "evaluaciones del modelo (malla adaptativa)",
+        "lod": "Nivel de detalle 3D", "lod_names": {"low": "Bajo", "medium": "Medio", "high": "Alto"},
         "reg_title": "Cumplimiento Normativo y GHS",
         "h_phrases": "⚠️ Indicaciones de Peligro (Frases H)",
+        "signal": "Palabra de advertencia", "signal_words": {"Danger": "Peligro", "Warning": "Atención"},
         "p_phrases": "🛡️ Consejos de Prudencia (Frases P)",
         "flam_title": "🔥 Clasificación de Inflamabilidad CLP/ECHA",
         "calc_fp": "Punto de Inflamación calculado",
@@ -167,6 +237,9 @@ LANGS = {
         "tip": "💡 **Consejo de mezcla:** Mezcle primero la fase orgánica (pasos 1-4), luego añada la fase acuosa (paso 5) con agitación persistente.",
         "report_title": "📄 Generación de Informe",
         "tds_btn": "📥 Descargar Ficha Técnica (TXT)",
+        "plan_title": "🗓️ Planificador de Producción (varios lotes)",
+        "plan_upload": "CSV de programación (lot, resin, solvent, cosolvent, surfactant, cosurfactant, aqueous, p_sol … salinity, volume_l, due)",
+        "plan_vessels": "Reactores (nombre:litros, separados por comas)",
         "ref_data": "📚 Datos científicos de referencia",
         "origin": "Origen",
         "code": "Código",
@@ -223,10 +296,38 @@ LANGS = {
         "opt_wait": "Calculando proporcións óptimas...",
         "opt_succ": "Optimizado! Solvente: ",
         "opt_err": "Non converxeu. Probe outro punto de inicio.",
+        "opt_mode": "Modo do optimizador",
+        "opt_modes": ["Local", "Multiarranque (busca global)", "Balance de masa exacto (todas as fases)"],
+        "pareto_btn": "📈 Fronte de Compromiso: RED / HLD / Custo / Punto de Inflamación",
+        "screen_btn": "🔎 Cribado de Todas as Combinacións",
+        "job_best": "Mellor ata agora",
+        "cancel_btn": "Cancelar",
+        "job_cancelled": "Traballo cancelado.",
         "red_help": "Diferenza de Enerxía Relativa. RED < 1: Soluble (Dentro da esfera). RED > 1: Insoluble (Fóra).",
         "hld_help": "Diferenza Hidrófila-Lipófila. Equilibra a afinidade do tansioactivo. Rango estable: -0.5 a +0.5.",
+        "unc_mode": "🎲 Modo incerteza (Monte Carlo)",
+        "unc_spec": "Incerteza dos parámetros",
+        "unc_dist": "Distribución",
+        "unc_params": {"hsp": "HSP dos compoñentes (MPa½)", "res_hsp": "HSP da resina (MPa½)", "r0": "R0 da resina (MPa½)",
+                       "eacn": "EACN", "cc": "Cc do tensioactivo", "rho": "Densidade (rel.)", "fp": "Punto de inflamación (°C)",
+                       "weighing": "Pesada (rel.)", "salinity": "Salinidade (rel.)"},
+        "ci": "IC 95%",
+        "p_stable": "P(|HLD| < 0,5)",
+        "p_soluble": "P(RED < 1)",
+        "p_ok": "P(estable e soluble)",
+        "sobol_mode": "🎯 Análise de sensibilidade (índices de Sobol)",
+        "sobol_caption": "Índice total ST: fracción da varianza da saída debida a cada entrada, interaccións incluídas (ao pasar o rato: S1 de primeira orde).",
+        "cc": "Cc do tensioactivo", "eacn": "EACN do solvente",
+        "pmap_mode": "🗺️ Mapas de fase HLD (varrido Winsor)",
+        "pmap_kinds": ["Salinidade × Temperatura", "Salinidade × EACN do aceite"],
+        "temp": "Temperatura (°C)", "oil_eacn": "EACN do aceite", "optimum": "HLD = 0",
+        "tern_mode": "🔺 Diagrama pseudoternario (aceite / auga / S-mix)",
+        "tern_props": ["Estabilidade (|HLD|)", "Solubilidade (RED)", "Inflamabilidade (CLP)"],
+        "tern_evals": "avaliacións do modelo (malla adaptativa)",
+        "lod": "Nivel de detalle 3D", "lod_names": {"low": "Baixo", "medium": "Medio", "high": "Alto"},
         "reg_title": "Cumprimento Normativo e GHS",
         "h_phrases": "⚠️ Indicacións de Perigo (Frases H)",
+        "signal": "Palabra de advertencia", "signal_words": {"Danger": "Perigo", "Warning": "Atención"},
         "p_phrases": "🛡️ Consellos de Prudencia (Frases P)",
         "flam_title": "🔥 Clasificación de Inflamabilidade CLP/ECHA",
         "calc_fp": "Punto de Inflamación calculado",
@@ -251,6 +352,9 @@ LANGS = {
         "tip": "💡 **Consello de mestura:** Mesture primeiro a fase orgánica (pasos 1-4), despois engada a fase acuosa (paso 5) con axitación persistente.",
         "report_title": "📄 Xeración de Informe",
         "tds_btn": "📥 Descargar Ficha Técnica (TXT)",
+        "plan_title": "🗓️ Planificador de Produción (varios lotes)",
+        "plan_upload": "CSV de programación (lot, resin, solvent, cosolvent, surfactant, cosurfactant, aqueous, p_sol … salinity, volume_l, due)",
+        "plan_vessels": "Reactores (nome:litros, separados por comas)",
         "ref_data": "📚 Datos científicos de referencia",
         "origin": "Orixe",
         "code": "Código",
@@ -260,55 +364,6 @@ LANGS = {
     }
 }
 
-DATA_FULL = {
-    # We use English keys for internally matching but localized display where needed
-    "Aqueous": {
-        "Pure Water": {"hsp": [15.5, 16.0, 42.1], "rho": 997, "fp": 1000, "price": 0.01},
-        "Distilled Water": {"hsp": [15.5, 16.0, 42.1], "rho": 998, "fp": 1000, "price": 0.05},
-        "Process Water": {"hsp": [15.5, 16.0, 42.1], "rho": 1005, "fp": 1000, "price": 0.005},
-    },
-    "Solvents": {
-        "Methyl Sunflowerate": {"hsp": [16.2, 3.2, 3.8], "rho": 880, "eacn": 1.5, "fp": 170, "price": 1.65, "ghs": []},
-        "Methyl Soyate": {"hsp": [16.1, 3.1, 3.7], "rho": 885, "eacn": 1.4, "fp": 175, "price": 1.60, "ghs": []},
-        "Methyl Palmitate": {"hsp": [16.3, 3.3, 3.9], "rho": 870, "eacn": 1.8, "fp": 180, "price": 1.55, "ghs": []},
-        "DBE (Dibasic Esters)": {"hsp": [16.5, 7.5, 7.0], "rho": 1060, "eacn": -5.4, "fp": 108, "price": 2.85, "ghs": ["H319", "P264", "P280", "P305+P351+P338"]},
-        "Toluene": {"hsp": [18.0, 1.4, 2.0], "rho": 867, "eacn": 1.0, "fp": 4, "price": 0.95, "ghs": ["H225", "H304", "H315", "H336", "H361d", "P210", "P260", "P280", "P301+P310", "P331"]},
-        "Butyl Acetate": {"hsp": [15.8, 3.7, 6.3], "rho": 881, "eacn": -2.5, "fp": 22, "price": 1.25, "ghs": ["H226", "H336", "P210", "P261", "P304+P340"]},
-    },
-    "Cosolvents": {
-        "None": {"hsp": [0, 0, 0], "rho": 1.0, "f_hld": 0, "fp": 200, "price": 0, "ghs": []},
-        "Benzilic Alcohol": {"hsp": [18.4, 6.3, 13.7], "rho": 1045, "f_hld": -0.2, "fp": 93, "price": 2.45, "ghs": ["H302", "H332", "P261", "P264", "P270"]},
-        "Propylene Carbonate": {"hsp": [20.0, 18.0, 4.1], "rho": 1200, "f_hld": 0.1, "fp": 132, "price": 2.10, "ghs": ["H319", "P264", "P280"]},
-        "Glycerin": {"hsp": [17.4, 12.1, 29.3], "rho": 1260, "f_hld": -0.8, "fp": 160, "price": 0.95, "ghs": []},
-        "Butyl Diglycol": {"hsp": [16.0, 7.0, 10.6], "rho": 953, "f_hld": -0.2, "fp": 105, "price": 3.20, "ghs": ["H319", "P264", "P280"]},
-        "Cyrene": {"hsp": [18.9, 12.4, 7.1], "rho": 1250, "f_hld": 0.4, "fp": 108, "price": 8.50, "ghs": ["H319", "P264", "P280"]},
-        "Acetone": {"hsp": [15.5, 10.4, 7.0], "rho": 784, "f_hld": 0.0, "fp": -20, "price": 0.85, "ghs": ["H225", "H319", "H336", "P210", "P261", "P305+P351+P338"]},
-        "Loxanol (Generic)": {"hsp": [16.5, 4.2, 8.5], "rho": 980, "f_hld": -0.1, "fp": 105, "price": 4.20, "ghs": []},
-    },
-    "Surfactants": {
-        "APG (Non-Ionic)": {"cc": 1.5, "hlb": 13.5, "rho": 1100, "hsp": [18.0, 12.0, 15.0], "price": 4.50, "ghs": ["H318", "P280", "P305+P351+P338"], "type": "NI", "fp": 200},
-        "SLES (Anionic)": {"cc": -2.0, "hlb": 40.0, "rho": 1050, "hsp": [17.5, 11.0, 9.5], "price": 3.85, "ghs": ["H315", "H318", "P264", "P280", "P302+P352"], "type": "A", "fp": 200},
-        "Rokawin NL7": {"cc": 1.2, "hlb": 12.0, "rho": 1010, "hsp": [16.5, 6.0, 10.0], "price": 3.10, "ghs": ["H302", "H318", "P264", "P280", "P301+P312"], "type": "NI", "fp": 150},
-        "Kolliphor P188": {"cc": 3.5, "hlb": 29.0, "rho": 1060, "hsp": [17.0, 8.0, 12.0], "price": 12.50, "ghs": [], "type": "NI", "fp": 250},
-        "Tween 80": {"cc": 2.2, "hlb": 15.0, "rho": 1070, "hsp": [17.5, 10.5, 14.0], "price": 5.80, "ghs": [], "type": "NI", "fp": 113},
-    },
-    "Cosurfactants": {
-        "Ethanol": {"hsp": [15.8, 8.8, 19.4], "rho": 789, "fp": 13, "price": 1.20, "ghs": ["H225", "H319", "P210", "P233", "P280"]},
-        "Butanol": {"hsp": [16.0, 5.7, 15.8], "rho": 810, "fp": 35, "price": 1.80, "ghs": ["H226", "H302", "H315", "H318", "H335", "P210", "P261", "P280"]},
-        "Isopropanol (IPA)": {"hsp": [15.8, 6.1, 16.4], "rho": 786, "fp": 12, "price": 1.50, "ghs": ["H225", "H319", "H336", "P210", "P261", "P280"]},
-    },
-    "Resins": {
-        "Alkydic": {"hsp": [18.5, 4.5, 5.1], "r0": 8.0},
-        "Nitrocellulose": {"hsp": [15.4, 10.1, 8.8], "r0": 11.5},
-        "Polyurethane": {"hsp": [17.8, 10.5, 11.2], "r0": 9.0},
-        "PVC": {"hsp": [18.8, 9.2, 3.5], "r0": 7.5},
-        "Acrylic": {"hsp": [18.5, 9.0, 7.5], "r0": 9.2},
-        "Chlorinated Rubber": {"hsp": [18.0, 6.0, 7.0], "r0": 8.5},
-        "Synthetic": {"hsp": [17.5, 3.5, 3.0], "r0": 7.0},
-        "Epoxy-Polyamide": {"hsp": [18.5, 9.5, 10.0], "r0": 11.0},
-    }
-}
-
 GHS_MAP_GLOBAL = {
     # We define translation inside local logic
 }
@@ -322,22 +377,6 @@ PICTOGRAMS = {
     "Environment": "https://upload.wikimedia.org/wikipedia/commons/thumb/d/d3/GHS-pictogram-pollut.svg/100px-GHS-pictogram-pollut.svg.png"
 }
 
-# --- 2. LOGIC FUNCTIONS ---
-def calculate_hld(sf, oil_eacn, salinity, temp=25):
-    k = 0.17
-    s = salinity if salinity > 0 else 0.001
-    if sf.get("type") == "A": return np.log(s) - k * oil_eacn + sf["cc"]
-    else: return 0.13 * s - k * oil_eacn + sf["cc"]
-
-def calculate_red(h_mix, resin):
-    ra = np.sqrt(4 * (h_mix[0] - resin["hsp"][0])**2 + (h_mix[1] - resin["hsp"][1])**2 + (h_mix[2] - resin["hsp"][2])**2)
-    return ra / resin["r0"]
-
-def get_physical_properties(ws, rhos, fps):
-    rho_mix = 1 / np.sum(ws / rhos)
-    fp_mix = 10**np.sum(ws * np.log10(fps))
-    return rho_mix, fp_mix
-
 # --- 3. UI SETUP ---
 st.set_page_config(page_title="MicroSaaS Pro", layout="wide", page_icon="🧪")
 
@@ -431,143 +470,199 @@ with st.sidebar:
 W = DATA_FULL["Aqueous"][wat_k]
 S, C, Sf, A, R = DATA_FULL["Solvents"][sol_k], DATA_FULL["Cosolvents"][cos_k], DATA_FULL["Surfactants"][sur_k], DATA_FULL["Cosurfactants"][alc_k], DATA_FULL["Resins"][res_k]
 comps = [S, C, Sf, A, W]
-ws = np.array([p_sol, p_cos, p_sur, p_alc, p_wat]) / 100
-rho_mix, fp_mix = get_physical_properties(ws, np.array([c["rho"] for c in comps]), np.array([c.get("fp", 200) for c in comps]))
-v_fracs = (ws / np.array([c["rho"] for c in comps])) / np.sum(ws / np.array([c["rho"] for c in comps]))
-h_mix = np.dot(v_fracs, np.array([c["hsp"] for c in comps]))
-red = calculate_red(h_mix, R)
-oil_eacn = (p_sol * S["eacn"] + p_cos * C.get("f_hld", 0)) / (p_sol + p_cos) if (p_sol + p_cos) > 0 else 0
-hld = calculate_hld(Sf, oil_eacn, salinity)
+ev = evaluate_cached(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, p_sol, p_cos, p_sur, p_alc, p_wat, salinity)
 
 st.title(L["title"])
 st.markdown("---")
 
 t1, t2, t3 = st.tabs(L["tabs"])
 
-with t1:
-    col_l, col_r = st.columns([3, 2])
-    with col_l:
-        st.subheader(L["hsp_title"])
-        u, v = np.mgrid[0:2*np.pi:40j, 0:np.pi:20j]
-        x_s = R['r0'] * np.cos(u) * np.sin(v) + R['hsp'][0]
-        y_s = R['r0'] * np.sin(u) * np.sin(v) + R['hsp'][1]
-        z_s = R['r0'] * np.cos(v) + R['hsp'][2]
-        fig = go.Figure()
-        
-        # Resin Sphere Surface
-        fig.add_trace(go.Surface(x=x_s, y=y_s, z=z_s, opacity=0.4, showscale=False, colorscale=[[0, '#38bdf8'], [1, '#38bdf8']],
-            contours=dict(x=dict(show=True, color="white", width=1), y=dict(show=True, color="white", width=1), z=dict(show=True, color="white", width=1)),
-            name=f"{L['target']}: {res_k}", showlegend=True))
+# --- BACKGROUND JOBS ---
+def opt_summary(kind, x):
+    if kind == "constrained": return f"{L['opt_succ']} {x[0]:.1f}%, Cos: {x[1]:.1f}%, Surf: {x[2]:.1f}%, Alc: {x[3]:.1f}%, Water: {x[4]:.1f}%, Sal: {x[5]:.1f}%"
+    return f"{L['opt_succ']} {x[0]:.1f}%, Surf: {x[1]:.1f}%, Alc: {x[2]:.1f}%, Sal: {x[3]:.1f}%"
 
-        # Add all solvents and cosolvents as comparison points
-        sol_inside_x, sol_inside_y, sol_inside_z, sol_inside_n = [], [], [], []
-        sol_outside_x, sol_outside_y, sol_outside_z, sol_outside_n = [], [], [], []
-        
-        for category in ["Solvents", "Cosolvents"]:
-            for name, component in DATA_FULL[category].items():
-                if name == "None": continue
-                h = component["hsp"]
-                # Calculate RED for this specific component
-                ra = np.sqrt(4*(h[0]-R['hsp'][0])**2 + (h[1]-R['hsp'][1])**2 + (h[2]-R['hsp'][2])**2)
-                red_val = ra / R['r0']
-                
-                if red_val <= 1.0:
-                    sol_inside_x.append(h[0]); sol_inside_y.append(h[1]); sol_inside_z.append(h[2]); sol_inside_n.append(name)
-                else:
-                    sol_outside_x.append(h[0]); sol_outside_y.append(h[1]); sol_outside_z.append(h[2]); sol_outside_n.append(name)
+def show_optimum(kind, res):
+    if kind == "constrained" and not res.success: st.warning(f"{L['opt_err']} ({res.message}; max violation {res.violation:.2g})")
+    elif not res.success: st.warning(f"{L['opt_err']} ({res.message})")
+    else: st.success(opt_summary(kind, res.x))
 
-        # Plot In-Sphere Solvents (Red)
-        fig.add_trace(go.Scatter3d(x=sol_inside_x, y=sol_inside_y, z=sol_inside_z, 
-                                   mode='markers+text',
-                                   marker=dict(size=5, color='#ef4444', opacity=0.9),
-                                   text=sol_inside_n, textposition="top center",
-                                   textfont=dict(size=10, color="white"),
-                                   hoverinfo='text', name="Soluble DB Components"))
-        
-        # Plot Out-Sphere Solvents (Blue)
-        fig.add_trace(go.Scatter3d(x=sol_outside_x, y=sol_outside_y, z=sol_outside_z, 
-                                   mode='markers+text',
-                                   marker=dict(size=5, color='#3b82f6', opacity=0.7),
-                                   text=sol_outside_n, textposition="top center",
-                                   textfont=dict(size=10, color="#94a3b8"),
-                                   hoverinfo='text', name="Insoluble DB Components"))
+def job_view(state_key, show, polling):
+    job = jobs.status(st.session_state[state_key])
+    if job is None: return
+    if polling and job["status"] not in ("queued", "running"): st.rerun()  # one full rerun drops the polling timer
+    if job["status"] in ("queued", "running"):
+        st.progress(job["progress"], text=L["opt_wait"])
+        if job["best"] is not None:
+            st.caption(L["job_best"])
+            if job["kind"] == "screen": st.dataframe(job["best"].round(3))
+            else: st.caption(opt_summary(job["kind"], job["best"]))
+        if st.button(L["cancel_btn"], key=f"{state_key}_cancel"): jobs.cancel(job["id"])
+    elif job["status"] == "done": show(job["kind"], job["result"])
+    elif job["status"] == "cancelled": st.info(L["job_cancelled"])
+    else: st.error(job["error"])
 
-        # Current Formulation Point
-        fig.add_trace(go.Scatter3d(x=[h_mix[0]], y=[h_mix[1]], z=[h_mix[2]], 
-                                   mode='markers+text', 
-                                   marker=dict(size=14, color='#fbbf24', symbol='diamond', line=dict(color='white', width=2)), 
-                                   text=[L["current"]], textposition="bottom center",
-                                   textfont=dict(size=12, color="white"),
-                                   hoverinfo='text', name=L["current"]))
-        
-        # Resin Center
-        fig.add_trace(go.Scatter3d(x=[R['hsp'][0]], y=[R['hsp'][1]], z=[R['hsp'][2]], mode='markers', 
-                                   marker=dict(size=8, color='white'), 
-                                   text=[f"{res_k} {L['center']}"], hoverinfo='text',
-                                   name=f"{res_k} {L['center']}"))
-        
-        ctr, rv = R['hsp'], R['r0'] + 5
-        fig.update_layout(
-            paper_bgcolor='rgba(0,0,0,0)', 
-            plot_bgcolor='rgba(0,0,0,0)',
-            hovermode='closest',
-            hoverlabel=dict(bgcolor="#1e293b", font_size=14, font_family="Inter"),
-            scene=dict(
-                xaxis=dict(title='δD', range=[ctr[0]-rv, ctr[0]+rv], gridcolor="#475569"),
-                yaxis=dict(title='δP', range=[ctr[1]-rv, ctr[1]+rv], gridcolor="#475569"),
-                zaxis=dict(title='δH', range=[ctr[2]-rv, ctr[2]+rv], gridcolor="#475569"),
-                aspectmode='cube', bgcolor="#0f172a"
-            ), 
-            margin=dict(l=0, r=0, b=0, t=0), 
-            legend=dict(x=0.02, y=0.98, font=dict(color="white"), bgcolor="rgba(15, 23, 42, 0.8)")
-        )
+def job_panel(state_key, show):
+    """Result area of a background job; it polls every second only while the job is queued or running."""
+    job_id = st.session_state.get(state_key)
+    if job_id is None: return
+    polling = jobs.active(job_id)
+    st.fragment(job_view, run_every=1.0 if polling else None)(state_key, show, polling)
+
+def uncertainty_spec():
+    """User-given distributions for uncertainty mode, defaulting to UNCERTAINTY."""
+    with st.expander(L["unc_spec"]):
+        dist = st.radio(L["unc_dist"], DISTRIBUTIONS, horizontal=True, key="unc_dist")
+        cols = st.columns(3)
+        return {k: (dist, cols[i % 3].number_input(L["unc_params"][k], 0.0, value=float(v), format="%.3f", key=f"unc_{k}"))
+                for i, (k, (_, v)) in enumerate(UNCERTAINTY.items())}
+
+def phase_map_panel(sur_k, salinity, oil_eacn):
+    """HLD heatmap of the selected surfactant with the HLD = 0 curves of every surfactant."""
+    kind = st.radio(L["pmap_mode"], range(2), format_func=lambda i: L["pmap_kinds"][i], horizontal=True,
+                    label_visibility="collapsed", key="pmap_kind")
+    if kind == 0:
+        m, y_key, y_title, y_now = salinity_temperature_map(oil_eacn), "temp", L["temp"], HLD_T_REF
+    else:
+        temp = st.slider(L["temp"], 5.0, 85.0, HLD_T_REF, step=1.0, key="pmap_temp")
+        m, y_key, y_title, y_now = salinity_eacn_map(temp), "eacn", L["oil_eacn"], oil_eacn
+    i = m["names"].index(sur_k)
+    pm = go.Figure(go.Heatmap(x=m["salinity"], y=m[y_key], z=m["hld"][i], zmid=0, zmin=-3, zmax=3,
+                              colorscale="RdBu_r", colorbar=dict(title="HLD"), name=sur_k))
+    for j, name in enumerate(m["names"]):
+        pm.add_trace(go.Scatter(x=m["optimum"][j], y=m[y_key], mode="lines", name=f"{L['optimum']} · {name}",
+                                line=dict(width=4 if j == i else 1.5, dash="solid" if j == i else "dot")))
+    pm.add_trace(go.Scatter(x=[salinity], y=[y_now], mode="markers", name=L["current"],
+                            marker=dict(size=12, color="yellow", symbol="x")))
+    pm.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color="white"),
+        xaxis=dict(title=L["salinity"], range=[m["salinity"][0], m["salinity"][-1]]), yaxis=dict(title=y_title),
+        margin=dict(l=0, r=0, b=0, t=10), legend=dict(orientation="h", y=-0.25))
+    st.plotly_chart(pm, width="stretch")
+
+def ternary_panel(keys, pcts, salinity):
+    """Pseudo-ternary map coloured by one region property; each class is one trace of filled mesh triangles."""
+    k = st.radio(L["tern_mode"], range(3), format_func=lambda i: L["tern_props"][i], horizontal=True,
+                 label_visibility="collapsed", key="tern_prop")
+    prop = list(REGIONS)[k]
+    names = [[L["high"], L["medium"], L["low"]], [L["excellent"], L["partial"], L["poor"]],
+             [L["clp2"], L["clp3"], L["non_flam"]]][k]
+    colors = ["#22c55e", "#f59e0b", "#ef4444"] if k < 2 else ["#ef4444", "#f59e0b", "#22c55e"]
+    d = pseudo_ternary(*keys, pcts, salinity)
+    P, region = d["points"], triangle_regions(d, prop)
+    tf = go.Figure()
+    for c in range(3):
+        tri = d["triangles"][region == c]
+        if not len(tri): continue
+        ring = np.column_stack([tri, tri[:, :1], np.full(len(tri), -1)]).ravel()  # closed triangles split by gaps
+        col = lambda name: np.where(ring >= 0, P[name].to_numpy()[ring], None)
+        tf.add_trace(go.Scatterternary(a=col("oil"), b=col("water"), c=col("smix"), mode="lines", fill="toself",
+                                       fillcolor=colors[c], line=dict(width=0, color=colors[c]), name=names[c], hoverinfo="skip"))
+    p_sol, p_cos, p_sur, p_alc, p_wat = pcts
+    tf.add_trace(go.Scatterternary(a=[p_sol + p_cos], b=[p_wat], c=[p_sur + p_alc], mode="markers", name=L["current"],
+                                   marker=dict(size=12, color="white", symbol="x")))
+    tf.update_layout(paper_bgcolor='rgba(0,0,0,0)', font=dict(color="white"), margin=dict(l=30, r=30, b=30, t=30),
+        ternary=dict(sum=100, bgcolor="#1e293b", aaxis=dict(title=L["summary_org"]), baxis=dict(title=L["summary_wat"]),
+                     caxis=dict(title=L["summary_sur"])), legend=dict(orientation="h"))
+    st.plotly_chart(tf, width="stretch")
+    st.caption(f"{d['n_evals']:,} {L['tern_evals']}")
+
+# Each tab is a fragment: its own widgets rerun only that tab, sidebar changes rerun everything
+@st.fragment
+def lab_tab(keys, pcts, salinity, ev):
+    res_k, sol_k, cos_k, sur_k, alc_k, wat_k = keys
+    p_sol, p_cos, p_sur, p_alc, p_wat = pcts
+    h_mix, rho_mix, fp_mix, red, hld = ev["h_mix"], ev["rho"], ev["fp"], ev["red"], ev["hld"]
+    col_l, col_r = st.columns([3, 2])
+    with col_l:
+        st.subheader(L["hsp_title"])
+        lod = st.select_slider(L["lod"], list(LOD), value=APP_LOD, format_func=lambda k: L["lod_names"][k], key="hsp_lod")
+        # Figure is built once per session (resin / language / detail); reruns only move the formulation marker
+        fig_key = (res_k, lang_choice, lod)
+        if st.session_state.get("hsp_fig_key") != fig_key:
+            st.session_state["hsp_fig"] = hansen_figure(res_k, L["target"], L["current"], L["center"], lod)
+            st.session_state["hsp_fig_key"] = fig_key
+        fig = set_current_point(st.session_state["hsp_fig"], h_mix)
         st.plotly_chart(fig, width="stretch")
     with col_r:
         st.subheader(L["perf"])
+        unc = st.toggle(L["unc_mode"], key="unc_mode")
+        mc = monte_carlo(*keys, pcts, salinity, spec=uncertainty_spec()) if unc else None
         m1, m2 = st.columns(2)
+        # Without uncertainty mode the deltas are the margins to the RED = 1 boundary and the HLD window
         m1.metric(
             L["red"], 
             f"{red:.2f}", 
-            delta="-0.05" if red < 1 else "+0.05", 
-            delta_color="inverse",
+            delta=f"{L['p_soluble']} {mc['p_soluble']:.0%}" if unc else f"{red - 1:+.2f}", 
+            delta_color=("normal" if mc["p_soluble"] >= 0.5 else "inverse") if unc else "inverse",
             help=L["red_help"]
         )
         # HLD Metric with Stable/Unstable status and HLB in tooltip
-        st_state = L["stable"] if abs(hld) < 0.5 else L["unstable"]
+        st_state = L["stable"] if abs(hld) < HLD_WINDOW else L["unstable"]
         m2.metric(
             L["hld"], 
             f"{hld:.2f}", 
-            delta=st_state, 
-            delta_color="normal" if abs(hld) < 0.5 else "inverse",
+            delta=f"{L['p_stable']} {mc['p_stable']:.0%}" if unc else st_state, 
+            delta_color=("normal" if mc["p_stable"] >= 0.5 else "inverse") if unc else "normal" if abs(hld) < HLD_WINDOW else "inverse",
             help=f"{L['hld_help']} | {L['hlb_label']}: {Sf['hlb']:.1f}"
         )
+        if unc:
+            st.dataframe(pd.DataFrame([[mc[k][0], mc[k][1], mc[k][2]] for k in ["red", "hld", "fp", "rho"]],
+                                      index=[L["red"], L["hld"], L["fp"], L["density"]],
+                                      columns=["μ", f"{L['ci']} ↓", f"{L['ci']} ↑"]).round(2), width="stretch")
+            st.caption(f"{L['p_ok']}: **{mc['p_ok']:.1%}** · n = {MC_SAMPLES:,}")
+        if st.toggle(L["sobol_mode"], key="sobol_mode"):
+            sobol = sensitivity(*keys, pcts, salinity)
+            names = {"red": L["red"], "hld": L["hld"], "rho": L["density"], "fp": L["fp"]}
+            sf = go.Figure()
+            for out in SOBOL_OUTPUTS:
+                df = sobol[out]
+                sf.add_trace(go.Bar(x=[L[f] for f in df.index], y=df["ST"], name=names[out],
+                                    customdata=df["S1"], hovertemplate="ST %{y:.2f} · S1 %{customdata:.2f}"))
+            sf.update_layout(barmode="group", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color="white"),
+                yaxis=dict(title="ST", range=[0, 1], gridcolor="#475569"), margin=dict(l=0, r=0, b=0, t=10), legend=dict(orientation="h"))
+            st.plotly_chart(sf, width="stretch")
+            st.caption(L["sobol_caption"])
+        if st.toggle(L["pmap_mode"], key="pmap_mode"):
+            phase_map_panel(sur_k, salinity, ev["oil_eacn"])
+        if st.toggle(L["tern_mode"], key="tern_mode"):
+            ternary_panel(keys, pcts, salinity)
         st.markdown(f"### {L['phys']}")
         tds_dict = {L["density"]: f"{rho_mix:.1f} kg/m³", L["fp"]: f"{fp_mix:.1f} °C",
                     L["stability"]: f"✅ {L['high']}" if abs(hld) < 0.5 else f"⚠️ {L['medium']}" if abs(hld) < 1.0 else f"❌ {L['low']}",
                     L["solubility"]: f"✅ {L['excellent']}" if red < 1 else f"⚠️ {L['partial']}" if red < 1.5 else f"❌ {L['poor']}"}
         st.json(tds_dict)
+        opt_mode = st.radio(L["opt_mode"], range(3), format_func=lambda i: L["opt_modes"][i], horizontal=True)
         if st.button(L["opt_btn"]):
+            x0 = [p_sol, p_sur, p_alc, salinity]
+            if opt_mode == 2: job = jobs.submit("constrained", optimize_constrained, comps, R, [p_sol, p_cos, p_sur, p_alc, p_wat, salinity])
+            elif opt_mode == 1: job = jobs.submit("multistart", multistart, comps, R, p_cos, x0, key=(res_k, sol_k, cos_k, sur_k, alc_k, wat_k))
+            else: job = jobs.submit("local", optimize_formulation, comps, R, p_cos, x0)
+            st.session_state["opt_job"] = job
+        job_panel("opt_job", show_optimum)
+        if st.button(L["screen_btn"]):
+            st.session_state["screen_job"] = jobs.submit("screen", screen_all)
+        job_panel("screen_job", lambda kind, table: st.dataframe(table.round(3)))
+        if st.button(L["pareto_btn"]):
             with st.spinner(L["opt_wait"]):
-                def obj(x):
-                    p_wat_opt = 100 - x[0] - p_cos - x[1] - x[2]
-                    if p_wat_opt < 10: return 1e6
-                    ws_opt = np.array([x[0], p_cos, x[1], x[2], p_wat_opt]) / 100
-                    v_o = (ws_opt / np.array([c["rho"] for c in comps])) / np.sum(ws_opt / np.array([c["rho"] for c in comps]))
-                    h_o = np.dot(v_o, np.array([c["hsp"] for c in comps]))
-                    r_o = calculate_red(h_o, R)
-                    o_e = (x[0] * S["eacn"] + p_cos * C.get("f_hld", 0)) / (x[0] + p_cos)
-                    h_o_v = calculate_hld(Sf, o_e, x[3])
-                    return 10*h_o_v**2 + 5*r_o**2 + 0.1*x[1]
-                res = minimize(obj, [p_sol, p_sur, p_alc, salinity], bounds=[(10, 50), (5, 25), (2, 15), (0, 5)])
-                if res.success: st.success(f"{L['opt_succ']} {res.x[0]:.1f}%, Surf: {res.x[1]:.1f}%, Alc: {res.x[2]:.1f}%, Sal: {res.x[3]:.1f}%")
-                else: st.warning(L["opt_err"])
+                front = pareto_front(res_k, sol_k, cos_k, sur_k, alc_k, wat_k)
+            pf = go.Figure(go.Scatter(x=front["cost"], y=front["red"], mode="markers",
+                marker=dict(size=7, color=front["abs_hld"], colorscale="Viridis", showscale=True, colorbar=dict(title="|HLD|")),
+                customdata=front[["fp", "p_sol", "p_cos", "p_sur", "p_alc", "salinity"]].values,
+                hovertemplate="€%{x:.2f}/kg · RED %{y:.2f}<br>FP %{customdata[0]:.0f} °C<br>%{customdata[1]:.1f}/%{customdata[2]:.1f}/%{customdata[3]:.1f}/%{customdata[4]:.1f} · Sal %{customdata[5]:.1f}<extra></extra>"))
+            pf.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color="white"),
+                xaxis=dict(title="€/kg", gridcolor="#475569"), yaxis=dict(title="RED", gridcolor="#475569"), margin=dict(l=0, r=0, b=0, t=10))
+            st.plotly_chart(pf, width="stretch")
+            st.dataframe(front.round(3))
 
-with t2:
+@st.fragment
+def safety_tab(keys, ev):
+    fp_mix = ev["fp"]
     st.subheader(L["reg_title"])
     # Simplified GHS logic for unified app
     GHS_TEXTS = {
         "English": {
             "H225": "Highly flammable liquid and vapour", "H226": "Flammable liquid and vapour",
+            "H314": "Causes severe skin burns and eye damage",
             "H302": "Harmful if swallowed", "H304": "May be fatal if swallowed and enters airways",
             "H315": "Causes skin irritation", "H318": "Causes serious eye damage", "H319": "Causes serious eye irritation",
             "H332": "Harmful if inhaled", "H335": "May cause respiratory irritation", "H336": "May cause drowsiness or dizziness",
@@ -575,6 +670,7 @@ with t2:
         },
         "Español": {
             "H225": "Líquido y vapores muy inflamables", "H226": "Líquidos y vapores inflamables",
+            "H314": "Provoca quemaduras graves en la piel y lesiones oculares graves",
             "H302": "Nocivo en caso de ingestión", "H304": "Dañino en caso de ingestión pulmonar",
             "H315": "Provoca irritación cutánea", "H318": "Provoca lesiones oculares graves", "H319": "Provoca irritación ocular grave",
             "H332": "Nocivo en caso de inhalación", "H335": "Puede irritar las vías respiratorias", "H336": "Somnolencia o vértigo",
@@ -582,6 +678,7 @@ with t2:
         },
         "Galego": {
             "H225": "Líquido e vapores moi inflamables", "H226": "Líquido e vapores inflamables",
+            "H314": "Provoca queimaduras graves na pel e lesións oculares graves",
             "H302": "Nocivo en caso de inxestión", "H304": "Mortal en caso de inxestión e penetración pulmonar",
             "H315": "Irritación cutánea", "H318": "Lesións oculares graves", "H319": "Irritación ocular grave",
             "H332": "Nocivo por inhalación", "H335": "Irritación respiratoria", "H336": "Somnolencia ou vertixe",
@@ -589,17 +686,13 @@ with t2:
         }
     }
     
-    pictos, h_list, p_list = set(), [], []
-    H_KEYS = {"Flame": ["H225", "H226"], "Exclamation": ["H302", "H315", "H319", "H332", "H335", "H336"], "Corrosive": ["H318"], "Health": ["H304", "H361d"]}
-    
-    for name, c, w in [(sol_k, S, p_sol/100), (cos_k, C, p_cos/100), (sur_k, Sf, p_sur/100), (alc_k, A, p_alc/100)]:
-        if w > 0.05:
-            for code in c.get("ghs", []):
-                if code.startswith("H"):
-                    h_list.append({L["code"]: code, L["statement"]: GHS_TEXTS[lang_choice].get(code, code), L["origin"]: name})
-                    for k, v in H_KEYS.items():
-                        if code in v: pictos.add(k)
-                elif code.startswith("P"): p_list.append({L["code"]: code, L["origin"]: name})
+    # H-phrases and pictograms from the CLP mixture rules; P-phrases still follow the components above GHS_THRESHOLD
+    clp = classify_formulation(*keys, ev["ws"], fp_mix)
+    pictos = clp["pictograms"]
+    h_list = [{L["code"]: code, L["statement"]: GHS_TEXTS[lang_choice].get(code, code), L["origin"]: ", ".join(origin) or L["calc_fp"]}
+              for code, origin in clp["hazards"]]
+    p_list = [{L["code"]: code, L["origin"]: name} for code, name in ev["ghs"] if code.startswith("P")]
+    if clp["signal"]: st.markdown(f"**{L['signal']}: {L['signal_words'][clp['signal']]}**")
 
     if pictos:
         cols = st.columns(len(pictos))
@@ -613,21 +706,25 @@ with t2:
     c1, c2 = st.columns(2)
     with c1:
         st.info(f"**{L['calc_fp']}:** {fp_mix:.1f} °C")
-        if fp_mix < 23: st.error(L["clp2"]); st.caption("< 23°C")
+        if not np.isfinite(fp_mix) or fp_mix < 23: st.error(L["clp2"]); st.caption("< 23°C")
         elif 23 <= fp_mix <= 60: st.warning(L["clp3"]); st.caption("23°C - 60°C")
         else: st.success(L["non_flam"]); st.caption("> 60°C")
     with c2:
         voc = "Yes/Si" if S["fp"] < 250 else L["bio_voc"]
         st.write(f"**{L['voc']}:** {voc}")
 
-with t3:
+@st.fragment
+def batch_tab(keys, pcts, salinity, ev):
+    res_k, sol_k, cos_k, sur_k, alc_k, wat_k = keys
+    p_sol, p_cos, p_sur, p_alc, p_wat = pcts
+    rho_mix, fp_mix, red, hld = ev["rho"], ev["fp"], ev["red"], ev["hld"]
     st.header(L["batch_title"])
     c_b1, c_b2 = st.columns(2)
     with c_b1:
         bv = st.number_input(L["batch_vol"], 100, 50000, 1000)
         bc = st.slider(L["brine_conc"], 5.0, 25.0, 15.0)
     total_kg = bv * (rho_mix / 1000)
-    cost = np.sum(ws * np.array([c.get("price", 0) for c in comps])) * total_kg
+    cost = ev["cost"] * total_kg
     with c_b2:
         st.metric(L["total_mass"], f"{total_kg:.1f} kg")
         st.metric(L["total_cost"], f"€{cost:.2f}")
@@ -660,7 +757,26 @@ with t3:
     rep = f"TDS - {sol_k}\nMix: {p_sol}/{p_cos}/{p_sur}/{p_alc}/{p_wat}\nDensity: {rho_mix:.1f}\nFP: {fp_mix:.1f}\nHLD: {hld:.2f}\nRED: {red:.2f}"
     st.download_button(L["tds_btn"], rep, file_name="TDS.txt")
 
+    with st.expander(L["plan_title"]):
+        up = st.file_uploader(L["plan_upload"], type="csv")
+        vessels = st.text_input(L["plan_vessels"], "R1:2000, R2:5000, R3:10000")
+        if up is not None:
+            try:
+                plan = plan_production(pd.read_csv(up), parse_vessels(vessels))
+            except (KeyError, ValueError) as e:
+                st.error(str(e))
+            else:
+                for name in ["lots", "weighing", "demand", "brine"]:
+                    st.markdown(f"**{name.capitalize()}**")
+                    st.dataframe(plan[name].round(2))
+
+keys = (res_k, sol_k, cos_k, sur_k, alc_k, wat_k)
+pcts = (p_sol, p_cos, p_sur, p_alc, p_wat)
+with t1: lab_tab(keys, pcts, salinity, ev)
+with t2: safety_tab(keys, ev)
+with t3: batch_tab(keys, pcts, salinity, ev)
+
 with st.expander(L["ref_data"]):
     for k, v in DATA_FULL.items():
         st.write(f"**{k}**")
-        st.dataframe(pd.DataFrame(v).T)
\ No newline at end of file
+        st.dataframe(pd.DataFrame(dict(v)).T)
\ No newline at end of file
@@ -1,51 +1,17 @@
 import streamlit as st
-import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from scipy.optimize import minimize
+from engine import evaluate_components, localized
+from optimizer import optimize_formulation
+from plots import sphere_mesh
 
 # --- 1. BASE DE DATOS GLOBAL ---
 DATA = {
-    "Solventes (Fase Oleosa)": {
-        "Sunflowerato de Metilo": {"hsp": [16.2, 3.2, 3.8], "rho": 880, "eacn": 1.5, "fp": 170, "price": 1.65, "ghs": []},
-        "Soyato de Metilo": {"hsp": [16.1, 3.1, 3.7], "rho": 885, "eacn": 1.4, "fp": 175, "price": 1.60, "ghs": []},
-        "Palmitato de Metilo": {"hsp": [16.3, 3.3, 3.9], "rho": 870, "eacn": 1.8, "fp": 180, "price": 1.55, "ghs": []},
-        "DBE (Ésteres Dibásicos)": {"hsp": [16.5, 7.5, 7.0], "rho": 1060, "eacn": -5.4, "fp": 108, "price": 2.85, "ghs": ["H319", "P264", "P280", "P305+P351+P338"]},
-        "Tolueno": {"hsp": [18.0, 1.4, 2.0], "rho": 867, "eacn": 1.0, "fp": 4, "price": 0.95, "ghs": ["H225", "H304", "H315", "H336", "H361d", "P210", "P260", "P280", "P301+P310", "P331"]},
-        "Acetato de Butilo": {"hsp": [15.8, 3.7, 6.3], "rho": 881, "eacn": -2.5, "fp": 22, "price": 1.25, "ghs": ["H226", "H336", "P210", "P261", "P304+P340"]},
-    },
-    "Cosolventes": {
-        "Ningún": {"hsp": [0, 0, 0], "rho": 1.0, "f_hld": 0, "fp": 200, "price": 0, "ghs": []},
-        "Alcohol Bencílico": {"hsp": [18.4, 6.3, 13.7], "rho": 1045, "f_hld": -0.2, "fp": 93, "price": 2.45, "ghs": ["H302", "H332", "P261", "P264", "P270"]},
-        "Carbonato de Propileno": {"hsp": [20.0, 18.0, 4.1], "rho": 1200, "f_hld": 0.1, "fp": 132, "price": 2.10, "ghs": ["H319", "P264", "P280"]},
-        "Glicerina": {"hsp": [17.4, 12.1, 29.3], "rho": 1260, "f_hld": -0.8, "fp": 160, "price": 0.95, "ghs": []},
-        "Butil Diglicol": {"hsp": [16.0, 7.0, 10.6], "rho": 953, "f_hld": -0.2, "fp": 105, "price": 3.20, "ghs": ["H319", "P264", "P280"]},
-        "Cyrene": {"hsp": [18.9, 12.4, 7.1], "rho": 1250, "f_hld": 0.4, "fp": 108, "price": 8.50, "ghs": ["H319", "P264", "P280"]},
-        "Acetona": {"hsp": [15.5, 10.4, 7.0], "rho": 784, "f_hld": 0.0, "fp": -20, "price": 0.85, "ghs": ["H225", "H319", "H336", "P210", "P261", "P305+P351+P338"]},
-        "Loxanol (Xenérico)": {"hsp": [16.5, 4.2, 8.5], "rho": 980, "f_hld": -0.1, "fp": 105, "price": 4.20, "ghs": []},
-    },
-    "Tansioactivos": {
-        "APG (Non Iónico)": {"cc": 1.5, "hlb": 13.5, "rho": 1100, "hsp": [18.0, 12.0, 15.0], "price": 4.50, "ghs": ["H318", "P280", "P305+P351+P338"], "type": "NI", "fp": 200},
-        "SLES (Aniónico)": {"cc": -2.0, "hlb": 40.0, "rho": 1050, "hsp": [17.5, 11.0, 9.5], "price": 3.85, "ghs": ["H315", "H318", "P264", "P280", "P302+P352"], "type": "A", "fp": 200},
-        "Rokawin NL7": {"cc": 1.2, "hlb": 12.0, "rho": 1010, "hsp": [16.5, 6.0, 10.0], "price": 3.10, "ghs": ["H302", "H318", "P264", "P280", "P301+P312"], "type": "NI", "fp": 150},
-        "Kolliphor P188": {"cc": 3.5, "hlb": 29.0, "rho": 1060, "hsp": [17.0, 8.0, 12.0], "price": 12.50, "ghs": [], "type": "NI", "fp": 250},
-        "Tween 80": {"cc": 2.2, "hlb": 15.0, "rho": 1070, "hsp": [17.5, 10.5, 14.0], "price": 5.80, "ghs": [], "type": "NI", "fp": 113},
-    },
-    "Cotansioactivos (Alcohois)": {
-        "Etanol": {"hsp": [15.8, 8.8, 19.4], "rho": 789, "fp": 13, "price": 1.20, "ghs": ["H225", "H319", "P210", "P233", "P280"]},
-        "Butanol": {"hsp": [16.0, 5.7, 15.8], "rho": 810, "fp": 35, "price": 1.80, "ghs": ["H226", "H302", "H315", "H318", "H335", "P210", "P261", "P280"]},
-        "Isopropanol (IPA)": {"hsp": [15.8, 6.1, 16.4], "rho": 786, "fp": 12, "price": 1.50, "ghs": ["H225", "H319", "H336", "P210", "P261", "P280"]},
-    },
-    "Resinas (Obxectivos)": {
-        "Alquidica": {"hsp": [18.5, 4.5, 5.1], "r0": 8.0},
-        "Nitrocelulosa": {"hsp": [15.4, 10.1, 8.8], "r0": 11.5},
-        "Poliuretano": {"hsp": [17.8, 10.5, 11.2], "r0": 9.0},
-        "PVC": {"hsp": [18.8, 9.2, 3.5], "r0": 7.5},
-        "Acrílica": {"hsp": [18.5, 9.0, 7.5], "r0": 9.2},
-        "Caucho Clorado": {"hsp": [18.0, 6.0, 7.0], "r0": 8.5},
-        "Sintética": {"hsp": [17.5, 3.5, 3.0], "r0": 7.0},
-        "Epoxi-Poliamida": {"hsp": [18.5, 9.5, 10.0], "r0": 11.0},
-    }
+    "Solventes (Fase Oleosa)": localized("Solvents", {"Sunflowerato de Metilo": "Methyl Sunflowerate", "Soyato de Metilo": "Methyl Soyate", "Palmitato de Metilo": "Methyl Palmitate", "DBE (Ésteres Dibásicos)": "DBE (Dibasic Esters)", "Tolueno": "Toluene", "Acetato de Butilo": "Butyl Acetate"}),
+    "Cosolventes": localized("Cosolvents", {"Ningún": "None", "Alcohol Bencílico": "Benzilic Alcohol", "Carbonato de Propileno": "Propylene Carbonate", "Glicerina": "Glycerin", "Butil Diglicol": "Butyl Diglycol", "Cyrene": "Cyrene", "Acetona": "Acetone", "Loxanol (Xenérico)": "Loxanol (Generic)"}),
+    "Tansioactivos": localized("Surfactants", {"APG (Non Iónico)": "APG (Non-Ionic)", "SLES (Aniónico)": "SLES (Anionic)", "Rokawin NL7": "Rokawin NL7", "Kolliphor P188": "Kolliphor P188", "Tween 80": "Tween 80"}),
+    "Cotansioactivos (Alcohois)": localized("Cosurfactants", {"Etanol": "Ethanol", "Butanol": "Butanol", "Isopropanol (IPA)": "Isopropanol (IPA)"}),
+    "Resinas (Obxectivos)": localized("Resins", {"Alquidica": "Alkydic", "Nitrocelulosa": "Nitrocellulose", "Poliuretano": "Polyurethane", "PVC": "PVC", "Acrílica": "Acrylic", "Caucho Clorado": "Chlorinated Rubber", "Sintética": "Synthetic", "Epoxi-Poliamida": "Epoxy-Polyamide"}),
 }
 
 GHS_MAP = {
@@ -86,32 +52,6 @@ PICTOGRAMS = {
     "Environment": "https://upload.wikimedia.org/wikipedia/commons/thumb/d/d3/GHS-pictogram-pollut.svg/100px-GHS-pictogram-pollut.svg.png"
 }
 
-# --- 2. FUNCIÓNS LÓXICAS ---
-
-def calculate_hld(sf, oil_eacn, salinity, temp=25):
-    """Modelo de Diferencia Hidrofílica-Lipofílica."""
-    k = 0.17
-    s = salinity if salinity > 0 else 0.001
-    if sf.get("type") == "A":  # Aniónico
-        return np.log(s) - k * oil_eacn + sf["cc"]
-    else:  # Non Iónico
-        b = 0.13
-        return b * s - k * oil_eacn + sf["cc"]
-
-def calculate_red(h_mix, resin):
-    """Diferenza de Enerxía Relativa para a solubilidade."""
-    ra = np.sqrt(4 * (h_mix[0] - resin["hsp"][0])**2 + 
-                 (h_mix[1] - resin["hsp"][1])**2 + 
-                 (h_mix[2] - resin["hsp"][2])**2)
-    return ra / resin["r0"]
-
-def get_physical_properties(ws, rhos, fps):
-    """Estimar propiedades físicas da mestura."""
-    rho_mix = 1 / np.sum(ws / rhos)
-    log_fp = np.sum(ws * np.log10(fps))
-    fp_mix = 10**log_fp
-    return rho_mix, fp_mix
-
 # --- 3. CONFIGURACIÓN DA IU ---
 st.set_page_config(page_title="MicroSaaS Pro | Panel de Laboratorio", layout="wide", page_icon="🧪")
 
@@ -176,18 +116,9 @@ S, C, Sf, A, R = DATA["Solventes (Fase Oleosa)"][sol_k], DATA["Cosolventes"][cos
 
 W = {"hsp": [15.5, 16.0, 42.1], "rho": 997, "fp": 1000, "price": 0.01}
 components = [S, C, Sf, A, W]
-ws = np.array([p_sol, p_cos, p_sur, p_alc, p_wat]) / 100
-rhos = np.array([c["rho"] for c in components])
-fps = np.array([c.get("fp", 200) for c in components])
-hsps = np.array([c["hsp"] for c in components])
-
-rho_mix, fp_mix = get_physical_properties(ws, rhos, fps)
-v_fractions = (ws / rhos) / np.sum(ws / rhos)
-h_mix = np.dot(v_fractions, hsps)
-
-red = calculate_red(h_mix, R)
-oil_eacn = (p_sol * S["eacn"] + p_cos * C.get("f_hld", 0)) / (p_sol + p_cos) if (p_sol + p_cos) > 0 else 0
-hld = calculate_hld(Sf, oil_eacn, salinity)
+ev = evaluate_components(components, [sol_k, cos_k, sur_k, alc_k, "Water"], R, [p_sol, p_cos, p_sur, p_alc, p_wat], salinity)
+ws, v_fractions, h_mix = ev["ws"], ev["v_fracs"], ev["h_mix"]
+rho_mix, fp_mix, red, oil_eacn, hld = ev["rho"], ev["fp"], ev["red"], ev["oil_eacn"], ev["hld"]
 
 # --- 4. SECCIÓNS DO PANEL ---
 t1, t2, t3 = st.tabs(["📊 Análise de Laboratorio", "🛡️ Seguridade e Normativa", "🏭 Fabricación"])
@@ -196,10 +127,7 @@ with t1:
     col_l, col_r = st.columns([3, 2])
     with col_l:
         st.subheader("Espazo de Solubilidade de Hansen (3D)")
-        u, v = np.mgrid[0:2*np.pi:40j, 0:np.pi:20j]
-        x_s = R['r0'] * np.cos(u) * np.sin(v) + R['hsp'][0]
-        y_s = R['r0'] * np.sin(u) * np.sin(v) + R['hsp'][1]
-        z_s = R['r0'] * np.cos(v) + R['hsp'][2]
+        x_s, y_s, z_s = sphere_mesh(tuple(R['hsp']), R['r0'])
         fig = go.Figure()
         fig.add_trace(go.Surface(x=x_s, y=y_s, z=z_s, opacity=0.4, showscale=False,
             colorscale=[[0, '#38bdf8'], [1, '#38bdf8']],
@@ -230,17 +158,7 @@ with t1:
         st.json(tds_data)
         if st.button("🚀 Optimizador: Minimizar RED e HLD"):
             with st.spinner("Calculando proporcións óptimas..."):
-                def obj(x):
-                    p_wat_opt = 100 - x[0] - p_cos - x[1] - x[2]
-                    if p_wat_opt < 10: return 1e6
-                    ws_opt = np.array([x[0], p_cos, x[1], x[2], p_wat_opt]) / 100
-                    v_opt = (ws_opt / rhos) / np.sum(ws_opt / rhos)
-                    h_opt = np.dot(v_opt, hsps)
-                    r_opt = calculate_red(h_opt, R)
-                    o_eacn = (x[0] * S["eacn"] + p_cos * C.get("f_hld", 0)) / (x[0] + p_cos)
-                    h_opt_val = calculate_hld(Sf, o_eacn, x[3])
-                    return 10*h_opt_val**2 + 5*r_opt**2 + 0.1*x[1]
-                res = minimize(obj, [p_sol, p_sur, p_alc, salinity], bounds=[(10, 50), (5, 25), (2, 15), (0, 5)])
+                res = optimize_formulation(components, R, p_cos, [p_sol, p_sur, p_alc, salinity])
                 if res.success:
                     st.success(f"Optimizado! Solvent: {res.x[0]:.1f}%, Tansioactivo: {res.x[1]:.1f}%, Alcohol: {res.x[2]:.1f}%, Salinidade: {res.x[3]:.1f}%")
                 else: st.warning("Non converxeu. Probe outro punto de inicio.")
@@ -248,16 +166,13 @@ with t1:
 with t2:
     st.subheader("Cumprimento Normativo e GHS")
     relevant_h, relevant_p, pictos_to_show = [], [], set()
-    check_list = [(sol_k, S, p_sol/100), (cos_k, C, p_cos/100), (sur_k, Sf, p_sur/100), (alc_k, A, p_alc/100)]
-    for name, comp, weight in check_list:
-        if weight > 0.05:
-            for code in comp.get("ghs", []):
-                if code in GHS_MAP:
-                    data = GHS_MAP[code]
-                    if data["cat"] == "H":
-                        relevant_h.append({"Código": code, "Indicación": data["text"], "Orixe": name})
-                        if "type" in data: pictos_to_show.add(data["type"])
-                    else: relevant_p.append({"Código": code, "Precaución": data["text"], "Orixe": name})
+    for code, name in ev["ghs"]:
+        if code in GHS_MAP:
+            data = GHS_MAP[code]
+            if data["cat"] == "H":
+                relevant_h.append({"Código": code, "Indicación": data["text"], "Orixe": name})
+                if "type" in data: pictos_to_show.add(data["type"])
+            else: relevant_p.append({"Código": code, "Precaución": data["text"], "Orixe": name})
 
     if pictos_to_show:
         pic_cols = st.columns(len(pictos_to_show))
@@ -286,7 +201,7 @@ with t3:
         batch_vol = st.number_input("Volume do lote (Litros)", 100, 50000, 1000)
         brine_conc = st.slider("Concentración de salmoira de stock (% NaCl)", 5.0, 25.0, 15.0)
     total_kg = batch_vol * (rho_mix / 1000)
-    cost_total = np.sum(ws * np.array([c.get("price", 0) for c in components])) * total_kg
+    cost_total = ev["cost"] * total_kg
     with col_batch2:
         st.metric("Masa Total do Lote", f"{total_kg:.1f} kg")
         st.metric("Custo Estimado de Materiais", f"€{cost_total:.2f}")
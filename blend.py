@@ -0,0 +1,121 @@
+from itertools import combinations, islice
+
+import numpy as np
+import pandas as pd
+
+from engine import STORE
+from hansen_index import HSP_SCALE, INDEX, within_red
+
+def simplex_lattice(k, step=5, min_frac=5):
+    """All k-part volume splits (in %) on a `step` grid, each part at least `min_frac`."""
+    lo = -(-min_frac // step)
+    n = 100 // step - k * lo  # grid units left after every part takes its minimum
+    if n < 0: return np.empty((0, k))
+    bars = np.array(list(combinations(range(n + k - 1), k - 1)), dtype=int).reshape(-1, k - 1)
+    first, last = np.full((len(bars), 1), -1), np.full((len(bars), 1), n + k - 1)
+    return (np.diff(np.hstack([first, bars, last]), axis=1) - 1 + lo) * step
+
+def _column(ix, key, store):
+    """A store column gathered for every point of a Hansen index."""
+    out = np.empty(len(ix["id"]))
+    for cat in np.unique(ix["cat"]):
+        m = ix["cat"] == cat
+        out[m] = store[cat][key][ix["id"][m]]
+    return out
+
+def blend_candidates(hsp, r0, max_red=3.0, max_candidates=None, index=None, store=None):
+    """Index positions worth blending, cheapest first.
+
+    Only components within `max_red` of the target sphere are kept: a blend
+    lies in the convex hull of its parts, so far-away parts rarely land
+    inside. `max_candidates` optionally keeps only that many of the cheapest
+    (a speed-up for interactive use, not a bound: it can miss cheaper blends).
+    """
+    ix = INDEX if index is None else index
+    T = STORE if store is None else store
+    pos, _ = within_red(hsp, r0, max_red, ix)
+    price = _column(ix, "price", T)[pos]
+    return pos[np.argsort(price, kind="stable")[:max_candidates]]
+
+def design_blends(hsp, r0, k=(2, 3, 4), step=5, min_frac=5, top=20, max_red=3.0, max_candidates=None,
+                  chunk=2_000_000, index=None, store=None):
+    """Cheapest k-component solvent/cosolvent blends whose volume-weighted HSP has RED ≤ 1.
+
+    Every subset of the candidates is evaluated on a simplex lattice of volume
+    fractions in one vectorised pass per chunk; only the cheapest feasible split
+    of each subset is kept. Subsets are enumerated by their cheapest part and
+    pruned with two exact bounds: the blend stays in the bounding box of its
+    parts, so boxes that miss the sphere are dropped, and every part holds at
+    least the lattice's smallest mass share w, so a blend costs at least
+    p_first + w * Σ (p_i - p_first). Once the current `top` are found, subsets
+    whose bound exceeds the worst of them are skipped, and the search stops
+    when the cheapest part alone costs more. Pairs run first and usually set
+    that bound for the larger blends.
+    """
+    ix = INDEX if index is None else index
+    T = STORE if store is None else store
+    center, r0 = np.asarray(hsp, dtype=float), float(r0)
+    cand = blend_candidates(center, r0, max_red, max_candidates, ix, T)
+    H = ix["hsp"][cand]
+    Hs, cs = H * HSP_SCALE, center * HSP_SCALE
+    rho, price = _column(ix, "rho", T)[cand], _column(ix, "price", T)[cand]
+    best = []  # (cost, subset, phi)
+
+    def add(S, L):
+        # the blend stays inside the bounding box of its parts: skip boxes that miss the sphere
+        box = Hs[S]
+        gap = np.maximum(box.min(axis=1) - cs, 0) + np.maximum(cs - box.max(axis=1), 0)
+        S = S[np.einsum("sd,sd->s", gap, gap) <= r0**2]
+        if not len(S): return
+        h = np.einsum("lk,skd->sld", L, H[S])
+        red = np.linalg.norm((h - center) * HSP_SCALE, axis=2) / r0
+        m = L[None] * rho[S][:, None]  # mass per unit volume of each part
+        cost = np.einsum("slk,sk->sl", m, price[S]) / m.sum(axis=2)
+        cost = np.where(red <= 1.0, cost, np.inf)
+        j = np.argmin(cost, axis=1)
+        c = cost[np.arange(len(S)), j]
+        keep = np.flatnonzero(np.isfinite(c))
+        if len(keep) > top: keep = keep[np.argpartition(c[keep], top - 1)[:top]]
+        best[:] = sorted(best + [(c[s], S[s], L[j[s]]) for s in keep], key=lambda b: b[0])[:top]
+
+    n = len(cand)
+    if n: rho_lo, rho_hi = rho.min(), rho.max()
+    for kk in k:
+        if kk > n: break
+        L = simplex_lattice(kk, step, min_frac) / 100
+        if not len(L): continue
+        f = L.min()
+        w = f * rho_lo / (f * rho_lo + (1 - f) * rho_hi)  # smallest mass share of any part
+        n_sub = max(1, chunk // len(L))
+        for first in range(n - kk + 1):
+            worst = best[-1][0] if len(best) >= top else np.inf
+            if price[first] >= worst: break
+            stop = n if np.isinf(worst) else np.searchsorted(price, price[first] + (worst - price[first]) / w)
+            combos = combinations(range(first + 1, stop), kk - 1)
+            while True:
+                rest = np.array(list(islice(combos, n_sub)), dtype=np.intp).reshape(-1, kk - 1)
+                if not len(rest): break
+                if len(best) >= top:
+                    rest = rest[price[first] + w * (price[rest] - price[first]).sum(axis=1) < best[-1][0]]
+                add(np.column_stack([np.full(len(rest), first), rest]), L)
+
+    rows = []
+    for cost, S, phi in best:
+        h = phi @ H[S]
+        w = phi * rho[S] / (phi @ rho[S])
+        rows.append({
+            "components": " + ".join(ix["names"][cand[S]]),
+            "n": len(S),
+            "v/v %": " / ".join(f"{100*p:.0f}" for p in phi),
+            "w/w %": " / ".join(f"{100*p:.1f}" for p in w),
+            "cost": cost,
+            "red": np.linalg.norm((h - center) * HSP_SCALE) / r0,
+            "δD": h[0], "δP": h[1], "δH": h[2],
+        })
+    return pd.DataFrame(rows, columns=["components", "n", "v/v %", "w/w %", "cost", "red", "δD", "δP", "δH"])
+
+def design_for_resin(res_k, **kw):
+    """design_blends() against a stored resin's sphere."""
+    R = STORE["Resins"]
+    i = R["index"][res_k]
+    return design_blends(R["hsp"][i], R["r0"][i], **kw)
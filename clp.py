@@ -0,0 +1,105 @@
+import numpy as np
+
+from engine import PHASES, STORE, formulation_index
+
+# --- 1. CLP MIXTURE RULES (Regulation (EC) 1272/2008, Annex I) ---
+# (hazard statement of the mixture, {ingredient H-code: weight}, limit in % w/w, additive)
+# Additive rules sum weight × concentration over all ingredients (e.g. eye irritation counts
+# Eye Dam. 1 ten-fold); non-additive rules need a single ingredient at or above the limit.
+# Acute toxicity cat. 4 uses the ATE additivity formula 100 / ATEmix = Σ C / ATE, which for
+# cat. 4 ingredients alone reduces to a route-specific sum: oral 100 * 500 / 2000 = 25 % (H302),
+# inhalation of vapours 100 * 11 / 20 = 55 % (H332; these liquids are inhaled as vapour, not as
+# dust or mist). Aspiration hazard ignores viscosity, which the database does not carry.
+CLP_RULES = [
+    ("H314", {"H314": 1}, 5.0, True),
+    ("H318", {"H314": 1, "H318": 1}, 3.0, True),
+    ("H315", {"H314": 10, "H315": 1}, 10.0, True),
+    ("H319", {"H314": 10, "H318": 10, "H319": 1}, 10.0, True),
+    ("H302", {"H302": 1}, 25.0, True),
+    ("H332", {"H332": 1}, 55.0, True),
+    ("H304", {"H304": 1}, 10.0, True),
+    ("H335", {"H335": 1}, 20.0, True),
+    ("H336", {"H336": 1}, 20.0, True),
+    ("H361d", {"H361d": 1}, 3.0, False),
+]
+# Flammable liquids follow the mixture flash point: < 23 °C cat. 2 (H225), 23-60 °C cat. 3 (H226);
+# an undefined flash point (a component with fp <= 0) is classified as cat. 2
+FLAM_CAT2, FLAM_CAT3 = 23.0, 60.0
+SUPERSEDES = {"H314": ["H315", "H318", "H319"], "H318": ["H319"]}  # the more severe class drops the milder one
+
+HAZARDS = [h for h, *_ in CLP_RULES] + ["H225", "H226"]
+PICTOGRAM_OF = {"H225": "Flame", "H226": "Flame", "H314": "Corrosive", "H318": "Corrosive",
+                "H302": "Exclamation", "H315": "Exclamation", "H319": "Exclamation", "H332": "Exclamation",
+                "H335": "Exclamation", "H336": "Exclamation", "H304": "Health", "H361d": "Health"}
+PICTOGRAMS = ["Flame", "Corrosive", "Exclamation", "Health"]
+DANGER = {"H225", "H304", "H314", "H318"}  # statements that carry the "Danger" signal word
+IRRITATION = {"H315", "H319"}  # shown without GHS07 when GHS05 is already on the label
+
+def rule_matrix(codes):
+    """(n_codes, n_rules) weight matrix of CLP_RULES over the store's GHS code list, plus the limits."""
+    pos = {c: j for j, c in enumerate(codes)}
+    W = np.zeros((len(codes), len(CLP_RULES)))
+    for r, (_, weights, _, _) in enumerate(CLP_RULES):
+        for code, w in weights.items():
+            if code in pos: W[pos[code], r] = w
+    return W, np.array([lim for _, _, lim, _ in CLP_RULES]), np.array([add for *_, add in CLP_RULES])
+
+# --- 2. BATCH CLASSIFICATION ---
+def hazard_concentrations(idx, ws, store=None):
+    """(N, n_codes) concentration (% w/w) of ingredients carrying each GHS code, and the largest single one."""
+    T = STORE if store is None else store
+    idx, pct = np.atleast_2d(idx), np.atleast_2d(ws) * 100
+    X = np.stack([T[cat]["ghs"][idx[:, j]] for j, cat in enumerate(PHASES[:4])], axis=1)  # (N, slot, code)
+    C = X * pct[:, :4, None]
+    return C.sum(axis=1), C.max(axis=1)
+
+def classify_batch(idx, ws, fp, store=None):
+    """CLP classification of N formulations in one pass.
+
+    `idx` and `ws` are (N, 5) component ids and w/w fractions in PHASES order,
+    `fp` the (N,) mixture flash points. Returns a dict of (N, len(HAZARDS))
+    hazard flags, (N, len(PICTOGRAMS)) pictogram flags and the signal word.
+    """
+    T = STORE if store is None else store
+    W, limits, additive = rule_matrix(T["ghs_codes"])
+    total, single = hazard_concentrations(idx, ws, T)
+    score = np.where(additive, total @ W, single @ W)
+    col = {h: k for k, h in enumerate(HAZARDS)}
+    H = np.zeros((len(score), len(HAZARDS)), dtype=bool)
+    H[:, :len(CLP_RULES)] = score >= limits - 1e-9
+    fp = np.broadcast_to(np.asarray(fp, dtype=float), (len(H),))
+    H[:, col["H225"]] = ~np.isfinite(fp) | (fp < FLAM_CAT2)  # an undefined flash point counts as the worst case
+    H[:, col["H226"]] = (fp >= FLAM_CAT2) & (fp <= FLAM_CAT3)
+    for strong, weak in SUPERSEDES.items():
+        for w in weak: H[:, col[w]] &= ~H[:, col[strong]]
+
+    P = np.zeros((len(H), len(PICTOGRAMS)), dtype=bool)
+    for h, p in PICTOGRAM_OF.items():
+        P[:, PICTOGRAMS.index(p)] |= H[:, col[h]] & (~P[:, PICTOGRAMS.index("Corrosive")] if h in IRRITATION else True)
+    danger = H[:, [col[h] for h in DANGER]].any(axis=1)
+    signal = np.where(danger, "Danger", np.where(H.any(axis=1), "Warning", ""))
+    return {"hazards": H, "pictograms": P, "signal": signal}
+
+def hazard_labels(H):
+    """Space-separated hazard statements per row of a classify_batch() flag matrix."""
+    codes = np.array(HAZARDS, dtype=object)
+    return [" ".join(codes[h]) for h in H]
+
+# --- 3. SINGLE FORMULATION ---
+def classify_formulation(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, ws, fp):
+    """CLP classification of one keyed formulation.
+
+    `hazards` lists (statement, ingredient names behind it); flammability
+    comes from the flash point and has no ingredient list.
+    """
+    _, idx = formulation_index(res_k, sol_k, cos_k, sur_k, alc_k, wat_k)
+    c = classify_batch(idx[None], np.asarray(ws, dtype=float)[None], [fp])
+    names = [sol_k, cos_k, sur_k, alc_k]
+    sources = dict((h, set(w)) for h, w, *_ in CLP_RULES)
+    hazards = []
+    for h in [h for h, on in zip(HAZARDS, c["hazards"][0]) if on]:
+        origin = [n for cat, i, n, w in zip(PHASES[:4], idx, names, ws) if w > 0
+                  and sources.get(h, set()) & {STORE["ghs_codes"][j] for j in np.flatnonzero(STORE[cat]["ghs"][i])}]
+        hazards.append((h, origin))
+    return {"hazards": hazards, "pictograms": [p for p, on in zip(PICTOGRAMS, c["pictograms"][0]) if on],
+            "signal": str(c["signal"][0])}
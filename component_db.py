@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from store import COLUMNS, EACN_KEY, KINDS, compile_store
+
+# --- 1. BINARY FORMAT ---
+# MAGIC | uint64 header length | JSON header | raw arrays, each starting on an ALIGN-byte boundary.
+# The header lists the categories in order with their names and, per array, its offset, dtype and shape.
+MAGIC = b"MECDB1\n"
+ALIGN = 64
+ARRAYS = ["hsp", *COLUMNS, "log_fp", "kind", "present", "ghs"]  # per-category arrays written to the file
+
+def _pad(n):
+    return -n % ALIGN
+
+def write_db(store, path):
+    """Write a compiled store (store.compile_store) to `path` in the memory-mappable format.
+
+    The file is written next to `path` and renamed over it, so processes that
+    still map the old file keep a consistent copy.
+    """
+    header, blobs, offset = {"ghs_codes": store["ghs_codes"], "categories": {}}, [], 0
+    for cat, col in store.items():
+        if cat == "ghs_codes": continue
+        entry = {"names": col["names"], "arrays": {}}
+        for key in ARRAYS:
+            a = np.ascontiguousarray(col[key])
+            entry["arrays"][key] = {"offset": offset, "dtype": a.dtype.str, "shape": list(a.shape)}
+            blobs.append(a.tobytes() + b"\0" * _pad(a.nbytes))
+            offset += a.nbytes + _pad(a.nbytes)
+        header["categories"][cat] = entry
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    head += b" " * _pad(len(MAGIC) + 8 + len(head))
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(head)) + head)
+        for b in blobs: f.write(b)
+    os.replace(tmp, path)
+
+def load_store(path):
+    """Memory-map a component database file into the store layout used by engine.evaluate_batch.
+
+    The numeric arrays are read-only views into one shared mapping, so every
+    process that loads the same file shares its pages through the OS cache.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a component database file")
+        (n_head,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(n_head).decode("utf-8"))
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    base = len(MAGIC) + 8 + n_head
+    store = {}
+    for cat, entry in header["categories"].items():
+        names = entry["names"]
+        col = {"names": names, "index": {k: i for i, k in enumerate(names)}, "ids": np.arange(len(names), dtype=np.int32)}
+        for key, a in entry["arrays"].items():
+            dt = np.dtype(a["dtype"])
+            start = base + a["offset"]
+            col[key] = mm[start:start + dt.itemsize * int(np.prod(a["shape"]))].view(dt).reshape(a["shape"])
+        col["anionic"] = col["kind"] == KINDS.index("A")
+        store[cat] = col
+    store["ghs_codes"] = header["ghs_codes"]
+    return store
+
+# --- 2. CSV CONVERTER ---
+# One row per component; an empty cell means the component does not define that field.
+# GHS codes are space-separated, e.g. "H225 H319 P210".
+CSV_COLUMNS = ["category", "name", "hsp_d", "hsp_p", "hsp_h", *COLUMNS, "type", "ghs"]
+
+def read_csv(path):
+    """Parse a component CSV into the nested {category: {name: component dict}} layout of DATA_FULL."""
+    db = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            cat = row["category"]
+            c = {}
+            hsp = [row["hsp_d"], row["hsp_p"], row["hsp_h"]]
+            if any(hsp): c["hsp"] = [float(v) for v in hsp]
+            for key in COLUMNS:
+                if row.get(key, ""): c[EACN_KEY.get(cat, "eacn") if key == "eacn" else key] = float(row[key])
+            if row.get("type", ""): c["type"] = row["type"]
+            if row.get("ghs", ""): c["ghs"] = row["ghs"].split()
+            db.setdefault(cat, {})[row["name"]] = c
+    return db
+
+def _num(v):
+    return "" if v == "" else f"{float(v):.15g}"
+
+def write_csv(db, path):
+    """Write a DATA_FULL-shaped dict as a component CSV (the inverse of read_csv)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        w.writeheader()
+        for cat, items in db.items():
+            for name, c in items.items():
+                row = {"category": cat, "name": name, "type": c.get("type", ""), "ghs": " ".join(c.get("ghs", []))}
+                row.update(zip(["hsp_d", "hsp_p", "hsp_h"], map(_num, c.get("hsp", ["", "", ""]))))
+                for key in COLUMNS:
+                    row[key] = _num(c.get(EACN_KEY.get(cat, "eacn") if key == "eacn" else key, ""))
+                w.writerow(row)
+
+def build(csv_path, db_path):
+    """CSV -> compiled store -> memory-mappable database file."""
+    write_db(compile_store(read_csv(csv_path)), db_path)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python component_db.py components.csv components.cdb")
+    build(sys.argv[1], sys.argv[2])
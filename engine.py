@@ -0,0 +1,249 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from component_db import load_store
+from store import store_view
+
+# --- 1. COMPONENT DATABASE ---
+# Memory-mapped from a file built by component_db.py; data/components.csv is the source of the default file.
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "components.cdb")
+STORE = load_store(os.environ.get("MICROEMULSION_DB", DEFAULT_DB))
+DATA_FULL = store_view(STORE)  # lazy {category: {name: component dict}} view for the dict-based code paths
+
+def localized(cat, names):
+    """{display label: DATA_FULL entry} for one category; `names` maps labels to DATA_FULL keys (a list keeps the keys)."""
+    if not isinstance(names, dict): names = {n: n for n in names}
+    return {label: DATA_FULL[cat][name] for label, name in names.items()}
+
+# Slot order of a formulation vector: solvent, cosolvent, surfactant, cosurfactant, water
+PHASES = ["Solvents", "Cosolvents", "Surfactants", "Cosurfactants", "Aqueous"]
+GHS_THRESHOLD = 0.05  # w/w fraction above which a component's GHS codes are carried over
+
+# --- 2. LOGIC FUNCTIONS ---
+HLD_K, HLD_B = 0.17, 0.13  # EACN slope and non-ionic salinity slope (% NaCl)
+HLD_T_REF = 25.0           # °C at which the surfactant cc values apply
+# HLD change per °C above HLD_T_REF: ethoxylated non-ionics turn lipophilic on heating, ionics hydrophilic
+HLD_CT_NI, HLD_CT_A = 0.06, -0.01
+
+def calculate_hld(sf, oil_eacn, salinity, temp=HLD_T_REF):
+    """Hydrophilic-Lipophilic Difference Model."""
+    s = salinity if salinity > 0 else 0.001
+    if sf.get("type") == "A": return np.log(s) - HLD_K * oil_eacn + sf["cc"] + HLD_CT_A * (temp - HLD_T_REF)
+    else: return HLD_B * s - HLD_K * oil_eacn + sf["cc"] + HLD_CT_NI * (temp - HLD_T_REF)
+
+def hld_array(salinity, oil_eacn, cc, anionic, temp=HLD_T_REF):
+    """calculate_hld() over broadcastable arrays (grids, batches)."""
+    s = np.where(np.asarray(salinity) > 0, salinity, 0.001)
+    dt = np.asarray(temp, dtype=float) - HLD_T_REF
+    return (np.where(anionic, np.log(s), HLD_B * s) - HLD_K * np.asarray(oil_eacn) + cc
+            + np.where(anionic, HLD_CT_A, HLD_CT_NI) * dt)
+
+def optimal_salinity(oil_eacn, cc, anionic, temp=HLD_T_REF):
+    """Salinity (% NaCl) at which HLD = 0, the inverse of hld_array() in salinity; may be negative for non-ionics."""
+    rest = -HLD_K * np.asarray(oil_eacn) + cc + np.where(anionic, HLD_CT_A, HLD_CT_NI) * (np.asarray(temp, dtype=float) - HLD_T_REF)
+    return np.where(anionic, np.exp(-rest), -rest / HLD_B)
+
+def calculate_red(h_mix, resin):
+    """Relative Energy Difference for Solubility."""
+    ra = np.sqrt(4 * (h_mix[0] - resin["hsp"][0])**2 + (h_mix[1] - resin["hsp"][1])**2 + (h_mix[2] - resin["hsp"][2])**2)
+    return ra / resin["r0"]
+
+def get_physical_properties(ws, rhos, fps):
+    """Estimate mixture density and flash point (Wickey-Chittenden approx)."""
+    rho_mix = 1 / np.sum(ws / rhos)
+    with np.errstate(invalid="ignore"):
+        fp_mix = 10**np.sum(np.where(ws > 0, ws * np.log10(fps), 0.0))  # absent slots drop out (log10 of fp <= 0 is NaN)
+    return rho_mix, fp_mix
+
+def mix_hsp(ws, rhos, hsps):
+    """Volume fractions and volume-weighted HSP of the mixture."""
+    v_fracs = (ws / rhos) / np.sum(ws / rhos)
+    return v_fracs, np.dot(v_fracs, hsps)
+
+def blend_eacn(p_sol, p_cos, solvent, cosolvent):
+    """Mass-weighted EACN of the oil phase (solvent + cosolvent)."""
+    if (p_sol + p_cos) <= 0: return 0
+    return (p_sol * solvent["eacn"] + p_cos * cosolvent.get("f_hld", 0)) / (p_sol + p_cos)
+
+def component_arrays(comps):
+    """Density, flash point, HSP and price arrays for a list of component dicts."""
+    rhos = np.array([c["rho"] for c in comps], dtype=float)
+    fps = np.array([c.get("fp", 200) for c in comps], dtype=float)
+    hsps = np.array([c["hsp"] for c in comps], dtype=float)
+    prices = np.array([c.get("price", 0) for c in comps], dtype=float)
+    return rhos, fps, hsps, prices
+
+def evaluate_components(comps, names, resin, pcts, salinity):
+    """Score one formulation given its five component dicts in PHASES order.
+
+    `pcts` are the w/w percentages of each slot and `names` the labels used as
+    the origin of the GHS codes.
+    """
+    S, C, Sf = comps[0], comps[1], comps[2]
+    ws = np.asarray(pcts, dtype=float) / 100
+    rhos, fps, hsps, prices = component_arrays(comps)
+    rho_mix, fp_mix = get_physical_properties(ws, rhos, fps)
+    v_fracs, h_mix = mix_hsp(ws, rhos, hsps)
+    oil_eacn = blend_eacn(pcts[0], pcts[1], S, C)
+    ghs = [(code, name) for name, c, w in zip(names[:4], comps[:4], ws[:4]) if w > GHS_THRESHOLD for code in c.get("ghs", [])]
+    return {
+        "ws": ws, "v_fracs": v_fracs, "h_mix": h_mix,
+        "rho": rho_mix, "fp": fp_mix,
+        "red": calculate_red(h_mix, resin),
+        "oil_eacn": oil_eacn,
+        "hld": calculate_hld(Sf, oil_eacn, salinity),
+        "cost": np.sum(ws * prices),  # €/kg of finished product
+        "ghs": ghs,
+    }
+
+def evaluate(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, p_sol, p_cos, p_sur, p_alc, p_wat, salinity):
+    """Score a formulation given by its DATA_FULL keys and w/w percentages."""
+    res_idx, idx = formulation_index(res_k, sol_k, cos_k, sur_k, alc_k, wat_k)
+    pcts = np.array([p_sol, p_cos, p_sur, p_alc, p_wat], dtype=float)
+    r = {k: v[0] for k, v in evaluate_batch(pcts, idx, res_idx, salinity).items()}
+    r["ws"] = pcts / 100
+    r["ghs"] = ghs_of(idx, r["ws"][:4])
+    return r
+
+# --- MEMOIZED EVALUATION ---
+EVAL_CACHE_SIZE = 4096
+EVAL_DECIMALS = 4  # w/w percentages and salinity are rounded to this many decimals to form the cache key
+
+def _frozen(v):
+    """A read-only version of one evaluate() value, safe to share between sessions."""
+    if isinstance(v, np.ndarray):
+        v = v.copy()
+        v.setflags(write=False)
+    return tuple(v) if isinstance(v, list) else v
+
+@lru_cache(maxsize=EVAL_CACHE_SIZE)
+def _evaluate_key(key):
+    return {k: _frozen(v) for k, v in evaluate(*key).items()}
+
+def evaluate_cached(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, p_sol, p_cos, p_sur, p_alc, p_wat, salinity):
+    """evaluate() through a process-wide LRU cache keyed on the quantized formulation.
+
+    Every session of a server process shares the cache, so identical
+    formulations cost one computation. Callers get their own copy of the result dict;
+    its arrays are read-only and `ghs` is a tuple, as they are shared.
+    """
+    nums = tuple(round(float(v), EVAL_DECIMALS) for v in (p_sol, p_cos, p_sur, p_alc, p_wat, salinity))
+    return dict(_evaluate_key((res_k, sol_k, cos_k, sur_k, alc_k, wat_k) + nums))
+
+def evaluate_cache_info():
+    """Hits, misses, current size and capacity of the evaluate_cached() cache."""
+    return _evaluate_key.cache_info()
+
+# --- 3. BATCH EVALUATION ---
+def evaluate_batch(pcts, idx, res_idx, salinity, store=None, temp=HLD_T_REF):
+    """Score N formulations at once.
+
+    `pcts` is an (N, 5) matrix of w/w percentages and `idx` an (N, 5) matrix of
+    component positions, both in PHASES order; `res_idx` and `salinity` are
+    length-N (or scalar), as is `temp` (°C). Returns a dict of length-N arrays.
+    """
+    pcts = np.atleast_2d(np.asarray(pcts, dtype=float))
+    return evaluate_params(pcts, salinity, batch_params(idx, res_idx, len(pcts), store), temp)
+
+def batch_params(idx, res_idx, n, store=None):
+    """The per-row model parameters of `n` formulations, gathered from the store for evaluate_params."""
+    T = STORE if store is None else store
+    idx = np.broadcast_to(np.asarray(idx, dtype=np.intp), (n, len(PHASES)))
+    res_idx = np.broadcast_to(np.asarray(res_idx, dtype=np.intp), (n,))
+
+    def col(key):
+        return np.stack([T[cat][key][idx[:, j]] for j, cat in enumerate(PHASES)], axis=1)
+
+    sf = idx[:, 2]
+    return {"rho": col("rho"), "log_fp": col("log_fp"), "hsp": col("hsp"), "price": col("price"),
+            "res_hsp": T["Resins"]["hsp"][res_idx], "r0": T["Resins"]["r0"][res_idx],
+            "eacn_sol": T["Solvents"]["eacn"][idx[:, 0]], "eacn_cos": T["Cosolvents"]["eacn"][idx[:, 1]],
+            "anionic": T["Surfactants"]["anionic"][sf], "cc": T["Surfactants"]["cc"][sf]}
+
+def evaluate_params(pcts, salinity, p, temp=HLD_T_REF):
+    """The batch model on explicit per-row parameters (as gathered by batch_params).
+
+    `p` holds rho, log_fp, price (N, 5), hsp (N, 5, 3), res_hsp (N, 3) and
+    r0, eacn_sol, eacn_cos, anionic, cc (N,); Monte Carlo callers pass
+    perturbed copies. `temp` (°C, scalar or (N,)) only enters HLD.
+    """
+    pcts = np.atleast_2d(np.asarray(pcts, dtype=float))
+    n = len(pcts)
+    sal = np.broadcast_to(np.asarray(salinity, dtype=float), (n,))
+    ws = pcts / 100
+    inv = ws / p["rho"]
+    inv_sum = inv.sum(axis=1)
+    rho_mix = 1 / inv_sum
+    fp_mix = 10**np.sum(np.where(ws > 0, ws * p["log_fp"], 0.0), axis=1)  # absent slots drop out
+
+    v_fracs = inv / inv_sum[:, None]
+    h_mix = np.einsum("nk,nkd->nd", v_fracs, p["hsp"])
+    d = h_mix - p["res_hsp"]
+    red = np.sqrt(4 * d[:, 0]**2 + d[:, 1]**2 + d[:, 2]**2) / p["r0"]
+
+    p_oil = pcts[:, 0] + pcts[:, 1]
+    eacn = p["eacn_sol"] * pcts[:, 0] + p["eacn_cos"] * pcts[:, 1]
+    oil_eacn = np.divide(eacn, p_oil, out=np.zeros(n), where=p_oil > 0)
+
+    hld = hld_array(sal, oil_eacn, p["cc"], p["anionic"], temp)
+
+    return {
+        "v_fracs": v_fracs, "h_mix": h_mix, "rho": rho_mix, "fp": fp_mix, "red": red,
+        "oil_eacn": oil_eacn, "hld": hld, "cost": np.sum(ws * p["price"], axis=1),
+    }
+
+def formulation_index(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, store=None):
+    """Resin id and (5,) component ids of a keyed formulation, for evaluate_batch."""
+    T = STORE if store is None else store
+    idx = np.array([T[cat]["index"][k] for cat, k in zip(PHASES, [sol_k, cos_k, sur_k, alc_k, wat_k])])
+    return T["Resins"]["index"][res_k], idx
+
+def ghs_of(idx, ws, store=None):
+    """(code, component name) pairs of the slots above GHS_THRESHOLD, read from the GHS bitmask."""
+    T = STORE if store is None else store
+    codes = T["ghs_codes"]
+    return [(codes[j], T[cat]["names"][i]) for cat, i, w in zip(PHASES[:4], idx, ws) if w > GHS_THRESHOLD
+            for j in np.flatnonzero(T[cat]["ghs"][i])]
+
+def index_batch(names, store=None):
+    """(N,) resin ids and (N, 5) component ids for an (N, 6) array of keys in AXES order
+    (resin, then PHASES); unknown keys get -1."""
+    T = STORE if store is None else store
+    names = np.asarray(names, dtype=object).reshape(-1, 6)
+    ids = np.empty(names.shape, dtype=np.intp)
+    for j, cat in enumerate(["Resins"] + PHASES):
+        u, inv = np.unique(names[:, j].astype(str), return_inverse=True)
+        ids[:, j] = np.array([T[cat]["index"].get(k, -1) for k in u], dtype=np.intp)[inv.ravel()]
+    return ids[:, 0], ids[:, 1:]
+
+def ghs_batch(idx, ws, store=None):
+    """(N, n_codes) mask of the GHS codes carried by each formulation (slots above GHS_THRESHOLD)."""
+    T = STORE if store is None else store
+    idx, ws = np.atleast_2d(idx), np.atleast_2d(ws)
+    mask = np.zeros((len(idx), len(T["ghs_codes"])), dtype=bool)
+    for j, cat in enumerate(PHASES[:4]):
+        mask |= T[cat]["ghs"][idx[:, j]] & (ws[:, j] > GHS_THRESHOLD)[:, None]
+    return mask
+
+# Column names of a tabular formulation (service requests, CLI files): keys in AXES order, then numbers
+RECORD_KEYS = ["resin", "solvent", "cosolvent", "surfactant", "cosurfactant", "aqueous"]
+RECORD_NUMS = ["p_sol", "p_cos", "p_sur", "p_alc", "p_wat", "salinity"]
+RECORD_DEFAULTS = {"cosolvent": "None", "p_cos": 0.0}  # optional columns
+
+def score_records(keys, nums, store=None):
+    """Score N tabular formulations: (N, 6) keys in RECORD_KEYS order and (N, 6) numbers in RECORD_NUMS order.
+
+    Returns evaluate_batch() arrays plus `ghs` (ghs_batch mask) and `valid`;
+    rows with an unknown key are scored against the first entry of each
+    category and flagged invalid.
+    """
+    T = STORE if store is None else store
+    nums = np.asarray(nums, dtype=float).reshape(-1, 6)
+    res_idx, idx = index_batch(keys, T)
+    valid = (res_idx >= 0) & np.all(idx >= 0, axis=1)
+    res_idx, idx = np.where(valid, res_idx, 0), np.where(valid[:, None], idx, 0)
+    r = evaluate_batch(nums[:, :5], idx, res_idx, nums[:, 5], T)
+    r["ghs"], r["valid"] = ghs_batch(idx, nums[:, :5] / 100, T), valid
+    return r
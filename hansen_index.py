@@ -0,0 +1,46 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from engine import STORE
+
+# Hansen distance Ra = sqrt(4ΔD² + ΔP² + ΔH²) is plain Euclidean distance after scaling δD by 2
+HSP_SCALE = np.array([2.0, 1.0, 1.0])
+INDEX_CATEGORIES = ("Solvents", "Cosolvents")
+
+def build_index(cats=INDEX_CATEGORIES, store=None):
+    """KD-tree over the scaled HSP of every component in `cats` that has HSP data.
+
+    Placeholders without HSP (all-zero or missing, like the "None" cosolvent)
+    are left out. Returns a dict with the tree and, per tree point, its
+    category, store id, name and raw HSP.
+    """
+    T = STORE if store is None else store
+    hsp = np.vstack([T[c]["hsp"] for c in cats])
+    keep = np.all(np.isfinite(hsp), axis=1) & np.any(hsp != 0, axis=1)
+    cat = np.repeat(np.array(cats, dtype=object), [len(T[c]["ids"]) for c in cats])
+    ids = np.concatenate([T[c]["ids"] for c in cats])
+    names = np.array([n for c in cats for n in T[c]["names"]], dtype=object)
+    return {"tree": cKDTree(hsp[keep] * HSP_SCALE), "cat": cat[keep], "id": ids[keep],
+            "names": names[keep], "hsp": hsp[keep]}
+
+INDEX = build_index()
+
+def within_red(hsp, r0, red=1.0, index=None):
+    """Tree positions of every component with RED ≤ `red` against the sphere (hsp, r0), and their RED."""
+    ix = INDEX if index is None else index
+    center = np.asarray(hsp, dtype=float) * HSP_SCALE
+    pos = np.array(sorted(ix["tree"].query_ball_point(center, r0 * red)), dtype=np.intp)
+    ra = np.linalg.norm(ix["hsp"][pos] * HSP_SCALE - center, axis=1)
+    return pos, ra / r0
+
+def nearest(hsp, k=5, index=None):
+    """Tree positions of the `k` components closest to `hsp` in Hansen distance, and their Ra."""
+    ix = INDEX if index is None else index
+    k = min(k, ix["tree"].n)
+    ra, pos = ix["tree"].query(np.asarray(hsp, dtype=float) * HSP_SCALE, k=k)
+    return np.atleast_1d(pos), np.atleast_1d(ra)
+
+def resin_members(res_id, red=1.0, index=None, store=None):
+    """within_red() for a stored resin."""
+    R = (STORE if store is None else store)["Resins"]
+    return within_red(R["hsp"][res_id], float(R["r0"][res_id]), red, index)
@@ -0,0 +1,73 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Process-wide job queue: long optimizer / screening runs execute on these threads (which in
+# turn fan out to the process pools of optimizer.multistart and screening.screen_all), so a
+# Streamlit session only submits and polls and a rerun never loses a running job.
+JOB_WORKERS = 4
+JOB_HISTORY = 256  # finished jobs kept for polling before the oldest are dropped
+
+class Cancelled(Exception):
+    """Raised inside a job's progress callback once cancel() was requested."""
+
+_jobs = {}
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+
+def _progress(job):
+    def report(done, total, best=None):
+        if job["cancel"].is_set(): raise Cancelled
+        job["progress"] = done / total if total else 0.0
+        if best is not None: job["best"] = best
+    return report
+
+def _run(job, fn, args, kwargs):
+    if job["cancel"].is_set():
+        job["status"] = "cancelled"
+        return
+    job["status"], job["started"] = "running", time.time()
+    try:
+        job["result"] = fn(*args, progress=_progress(job), **kwargs)
+        job["status"], job["progress"] = "done", 1.0
+    except Cancelled:
+        job["status"] = "cancelled"
+    except Exception as e:
+        job["status"], job["error"] = "failed", f"{type(e).__name__}: {e}"
+    job["finished"] = time.time()
+
+def _prune():
+    done = [k for k, j in _jobs.items() if j["status"] in ("done", "failed", "cancelled")]
+    for k in done[:max(0, len(done) - JOB_HISTORY)]: del _jobs[k]
+
+def submit(kind, fn, *args, **kwargs):
+    """Queue fn(*args, progress=callback, **kwargs) and return its job id.
+
+    `fn` reports through progress(done, total, best=None); the callback raises
+    Cancelled once the job is cancelled, which ends the run.
+    """
+    with _lock:
+        _prune()
+        job_id = next(_ids)
+        job = {"id": job_id, "kind": kind, "status": "queued", "progress": 0.0, "best": None,
+               "result": None, "error": None, "cancel": threading.Event(),
+               "created": time.time(), "started": None, "finished": None}
+        _jobs[job_id] = job
+    _executor.submit(_run, job, fn, args, kwargs)
+    return job_id
+
+def status(job_id):
+    """Snapshot of a job (without its cancel event), or None if unknown or pruned."""
+    job = _jobs.get(job_id)
+    return None if job is None else {k: v for k, v in job.items() if k != "cancel"}
+
+def cancel(job_id):
+    """Ask a job to stop; queued jobs never start, running ones stop at their next progress report."""
+    job = _jobs.get(job_id)
+    if job is not None: job["cancel"].set()
+
+def active(job_id):
+    job = _jobs.get(job_id)
+    return job is not None and job["status"] in ("queued", "running")
@@ -0,0 +1,206 @@
+import atexit
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy.optimize import LinearConstraint, minimize
+from scipy.stats import qmc
+
+from engine import HLD_B, HLD_K, component_arrays
+
+# x = [p_sol, p_sur, p_alc, salinity]
+OPT_BOUNDS = [(10, 50), (5, 25), (2, 15), (0, 5)]
+MIN_WATER = 10
+HSP_WEIGHTS = np.array([4.0, 1.0, 1.0])  # Hansen distance weights on (δD, δP, δH)
+
+# dz/dx for the 4-variable mode: z = [p_sol, p_cos, p_sur, p_alc, p_wat, salinity], water takes the balance
+_DZ = np.array([[1, 0, 0, 0, -1, 0],
+                [0, 0, 1, 0, -1, 0],
+                [0, 0, 0, 1, -1, 0],
+                [0, 0, 0, 0, 0, 1]], dtype=float)
+
+def composition_objective(comps, resin):
+    """Objective 10*HLD² + 5*RED² + 0.1*p_sur over all five phases, with its closed-form gradient.
+
+    `comps` are the five component dicts in PHASES order. All property arrays
+    are built once here; the returned function maps
+    z = [p_sol, p_cos, p_sur, p_alc, p_wat, salinity] to (value, gradient).
+    """
+    S, C, Sf = comps[0], comps[1], comps[2]
+    rhos, _, hsps, _ = component_arrays(comps)
+    center = np.asarray(resin["hsp"], dtype=float)
+    r0_sq = resin["r0"]**2
+    e_sol, e_cos = S["eacn"], C.get("f_hld", 0)
+    anionic, cc = Sf.get("type") == "A", Sf["cc"]
+
+    def fun(z):
+        p_sol, p_cos, p_sur, sal = z[0], z[1], z[2], z[5]
+        inv = np.asarray(z[:5]) / 100 / rhos
+        inv_sum = inv.sum()
+        h_mix = inv @ hsps / inv_sum
+        d = h_mix - center
+        red_sq = HSP_WEIGHTS @ d**2 / r0_sq
+
+        p_oil = p_sol + p_cos
+        oil_eacn = (p_sol * e_sol + p_cos * e_cos) / p_oil
+        s = sal if sal > 0 else 0.001
+        hld = (np.log(s) if anionic else HLD_B * s) - HLD_K * oil_eacn + cc
+
+        # RED² through the volume-weighted HSP: dh/dws_k = (hsp_k - h) / (rho_k * inv_sum)
+        dred_dh = 2 * HSP_WEIGHTS * d / r0_sq
+        grad = np.zeros(6)
+        grad[:5] = 5 * ((hsps - h_mix) @ dred_dh) / (rhos * inv_sum) / 100
+
+        dhld = np.zeros(6)
+        dhld[0] = -HLD_K * p_cos * (e_sol - e_cos) / p_oil**2
+        dhld[1] = -HLD_K * p_sol * (e_cos - e_sol) / p_oil**2
+        if sal > 0: dhld[5] = 1 / sal if anionic else HLD_B
+        grad += 20 * hld * dhld
+        grad[2] += 0.1
+        return 10 * hld**2 + 5 * red_sq + 0.1 * p_sur, grad
+
+    return fun
+
+def make_objective(comps, resin, p_cos):
+    """The composition objective over x = [p_sol, p_sur, p_alc, salinity] with p_cos held fixed.
+
+    Returns f(x) -> (value, gradient) for minimize(..., jac=True).
+    """
+    core = composition_objective(comps, resin)
+
+    def fun(x):
+        p_sol, p_sur, p_alc, sal = x
+        p_wat = 100 - p_sol - p_cos - p_sur - p_alc
+        if p_wat < MIN_WATER:  # same 1e6 wall, sloped so the line search can back out of it
+            return 1e6 + 1e4 * (MIN_WATER - p_wat), np.array([1e4, 1e4, 1e4, 0.0])
+        value, grad = core([p_sol, p_cos, p_sur, p_alc, p_wat, sal])
+        return value, _DZ @ grad
+
+    return fun
+
+def _iteration_callback(progress, maxiter):
+    """scipy callback forwarding (iteration, maxiter, current x) to a jobs-style progress function."""
+    if progress is None: return None
+    it = itertools.count(1)
+    return lambda xk: progress(min(next(it), maxiter), maxiter, np.array(xk))
+
+def optimize_formulation(comps, resin, p_cos, x0, bounds=OPT_BOUNDS, maxiter=100, progress=None):
+    """Minimise the objective from x0 with L-BFGS-B using the analytic gradient.
+
+    Runs over the database converge within about 20 iterations; `maxiter` is
+    also the total reported to `progress`.
+    """
+    x0 = np.clip(np.asarray(x0, dtype=float), [b[0] for b in bounds], [b[1] for b in bounds])
+    return minimize(make_objective(comps, resin, p_cos), x0, jac=True, method="L-BFGS-B", bounds=bounds,
+                    options={"maxiter": maxiter}, callback=_iteration_callback(progress, maxiter))
+
+# --- CONSTRAINED (ALL PHASES) ---
+# z = [p_sol, p_cos, p_sur, p_alc, p_wat, salinity]: sidebar slider ceilings (surfactant and
+# cosurfactant 20 %, water anchor 10-90 %, salinity 10 %) with the floors of OPT_BOUNDS
+CONSTRAINED_BOUNDS = [(10, 90), (0, 90), (5, 20), (2, 20), (10, 90), (0, 10)]
+
+def mass_balance_constraint():
+    """The five phases sum to exactly 100 % w/w."""
+    return LinearConstraint([[1, 1, 1, 1, 1, 0]], 100, 100)
+
+def optimize_constrained(comps, resin, z0, bounds=CONSTRAINED_BOUNDS, maxiter=200, progress=None):
+    """Minimise the composition objective over all five phases with SLSQP.
+
+    The mass balance is an exact linear equality instead of a penalty, and
+    the cosolvent amount is optimised too. A cosolvent without
+    HSP data (the "None" placeholder) is pinned to 0 %. The result carries
+    `violation`, the largest constraint or bound breach, so callers can report
+    why a run did not converge alongside `message`.
+    """
+    bounds = list(bounds)
+    if not np.any(comps[1]["hsp"]): bounds[1] = (0, 0)
+    lo, hi = np.array(bounds, dtype=float).T
+    z0 = np.clip(np.asarray(z0, dtype=float), lo, hi)
+    z0[4] = np.clip(100 - z0[:4].sum(), lo[4], hi[4])
+    con = mass_balance_constraint()
+    res = minimize(composition_objective(comps, resin), z0, jac=True, method="SLSQP",
+                   bounds=bounds, constraints=[con], options={"maxiter": maxiter},
+                   callback=_iteration_callback(progress, maxiter))
+    Az = con.A @ res.x
+    res.violation = max(np.max(con.lb - Az, initial=0), np.max(Az - con.ub, initial=0),
+                        np.max(lo - res.x, initial=0), np.max(res.x - hi, initial=0))
+    return res
+
+# --- MULTISTART ---
+WARM_CACHE_SIZE = 4096
+_warm_starts = {}  # (caller key, p_cos, bounds) -> (x, fun)
+_warm_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()  # multistart runs on several job threads at once
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor()
+            atexit.register(_executor.shutdown, cancel_futures=True)
+        return _executor
+
+def sobol_starts(n, bounds=OPT_BOUNDS, seed=0):
+    """n quasi-random starting points (Sobol, scrambled) spread over the bounds box."""
+    lo, hi = np.array(bounds, dtype=float).T
+    pts = qmc.Sobol(d=len(bounds), scramble=True, seed=seed).random(n)
+    return qmc.scale(pts, lo, hi)
+
+def _feasible(res):
+    return res.success and res.fun < 1e6
+
+def multistart(comps, resin, p_cos, x0=None, key=None, n_starts=16, bounds=OPT_BOUNDS, parallel=True, seed=0,
+               progress=None):
+    """Best local optimum over many starting points, warm-started from earlier runs.
+
+    `key` names the component selection (all six keys, water included); the
+    cache entry also records p_cos and the bounds, which change the objective.
+    If it was solved before, its cached solution is refined first and
+    returned when it still converges to a solution at least as good. Otherwise
+    x0 (if given) plus `n_starts` Sobol points are run concurrently in a
+    process pool and the best converged result is cached under `key`.
+    `progress(done, total, best_x)` is called as each start finishes.
+    """
+    if key is not None: key = (key, float(p_cos), tuple(map(tuple, bounds)))
+    with _warm_lock:
+        cached = _warm_starts.get(key) if key is not None else None
+    if cached is not None:
+        res = optimize_formulation(comps, resin, p_cos, cached[0], bounds)
+        if _feasible(res) and res.fun <= cached[1] + 1e-9 * max(1.0, abs(cached[1])):
+            res.n_starts, res.warm = 1, True
+            with _warm_lock: _warm_starts[key] = (res.x, res.fun)
+            return res
+
+    starts = list(sobol_starts(n_starts, bounds, seed))
+    if x0 is not None: starts.insert(0, x0)
+    if cached is not None: starts.insert(0, cached[0])
+    n = len(starts)
+    parallel = parallel and n > 1
+    if parallel:
+        futures = {_pool().submit(optimize_formulation, comps, resin, p_cos, s, bounds): i for i, s in enumerate(starts)}
+        finished = ((futures[f], f.result()) for f in as_completed(futures))
+    else:
+        finished = ((i, optimize_formulation(comps, resin, p_cos, s, bounds)) for i, s in enumerate(starts))
+    runs = [None] * n
+    try:
+        for count, (i, r) in enumerate(finished, 1):
+            runs[i] = r
+            if progress is not None:
+                best = min((r for r in runs if r is not None), key=lambda r: (not _feasible(r), r.fun))
+                progress(count, n, best.x)
+    except BaseException:
+        if parallel:
+            for f in futures: f.cancel()
+        raise
+
+    ok = [r for r in runs if _feasible(r)]
+    res = min(ok or runs, key=lambda r: r.fun)
+    res.n_starts, res.warm = n, False
+    if key is not None and _feasible(res):
+        with _warm_lock:
+            if key not in _warm_starts and len(_warm_starts) >= WARM_CACHE_SIZE:
+                _warm_starts.pop(next(iter(_warm_starts)))
+            _warm_starts[key] = (res.x, res.fun)
+    return res
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+from engine import evaluate_batch, formulation_index
+from optimizer import MIN_WATER
+
+# Decision vector: p_sol, p_cos, p_sur, p_alc, salinity (water takes the balance)
+PARETO_BOUNDS = [(10, 50), (0, 15), (5, 25), (2, 15), (0, 5)]
+OBJECTIVES = ["red", "abs_hld", "cost", "neg_fp"]  # all minimised; flash point is maximised
+
+def _objectives(X, res_idx, idx):
+    pcts = np.column_stack([X[:, :4], 100 - X[:, :4].sum(axis=1)])
+    r = evaluate_batch(pcts, idx, res_idx, X[:, 4])
+    # An undefined blend flash point (a component with fp <= 0) counts as the worst case
+    F = np.column_stack([r["red"], np.abs(r["hld"]), r["cost"], np.nan_to_num(-r["fp"], nan=np.inf)])
+    ok = (pcts[:, 4] >= MIN_WATER) & np.isfinite(F[:, :3]).all(axis=1)
+    return F, ok
+
+def non_dominated(F, block=1024):
+    """Boolean mask of the rows of F (all objectives minimised) that no other row dominates."""
+    n, m = F.shape
+    keep = np.ones(n, dtype=bool)
+    for a in range(0, n, block):
+        Fi = F[a:a + block]
+        weakly = np.ones((len(Fi), n), dtype=bool)
+        strictly = np.zeros((len(Fi), n), dtype=bool)
+        for k in range(m):  # one objective at a time keeps the temporaries 2-D
+            weakly &= F[:, k] <= Fi[:, k, None]
+            strictly |= F[:, k] < Fi[:, k, None]
+        keep[a:a + block] = ~(weakly & strictly).any(axis=1)
+    return keep
+
+def crowding_distance(F):
+    """NSGA-II crowding distance of each row of a front; boundary points get inf.
+
+    Objectives with non-finite values (e.g. an undefined flash point) do not
+    contribute.
+    """
+    F = F[:, np.isfinite(F).all(axis=0)]
+    n, m = F.shape
+    dist = np.zeros(n)
+    if not m: return dist
+    order = np.argsort(F, axis=0)
+    Fs = np.take_along_axis(F, order, axis=0)
+    span = np.where(Fs[-1] > Fs[0], Fs[-1] - Fs[0], 1.0)
+    gaps = np.zeros((n, m))
+    gaps[1:-1] = (Fs[2:] - Fs[:-2]) / span
+    gaps[[0, -1]] = np.inf
+    np.add.at(dist, order.ravel(), gaps.ravel())
+    return dist
+
+def pareto_front(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, n_pop=1024, n_gen=8, max_front=300, bounds=PARETO_BOUNDS, seed=0):
+    """Non-dominated (RED, |HLD|, €/kg, flash point) front for one component selection.
+
+    A Sobol population over `bounds` is evaluated in one evaluate_batch call,
+    then for `n_gen` generations the current front is perturbed with Gaussian
+    mutations and re-filtered. Fronts larger than `max_front` are thinned by
+    crowding distance. Returns a DataFrame sorted by cost.
+    """
+    rng = np.random.default_rng(seed)
+    res_idx, idx = formulation_index(res_k, sol_k, cos_k, sur_k, alc_k, wat_k)
+    lo, hi = np.array(bounds, dtype=float).T
+    if cos_k == "None": lo[1] = hi[1] = 0.0
+    X = lo + (hi - lo) * qmc.Sobol(d=len(bounds), seed=seed).random(n_pop)
+    F, ok = _objectives(X, res_idx, idx)
+    X, F = X[ok], F[ok]
+
+    for gen in range(n_gen + 1):
+        front = non_dominated(F)
+        X, F = X[front], F[front]
+        if len(X) > max_front:
+            best = np.argsort(-crowding_distance(F), kind="stable")[:max_front]
+            X, F = X[best], F[best]
+        if gen == n_gen or not len(X): break
+        sigma = 0.05 * (hi - lo) * (1 - gen / n_gen) + 1e-3
+        parents = X[rng.integers(0, len(X), n_pop)]
+        Y = np.clip(parents + rng.normal(0, sigma, parents.shape), lo, hi)
+        G, ok = _objectives(Y, res_idx, idx)
+        X, F = np.vstack([X, Y[ok]]), np.vstack([F, G[ok]])
+
+    df = pd.DataFrame(X, columns=["p_sol", "p_cos", "p_sur", "p_alc", "salinity"])
+    df.insert(4, "p_wat", 100 - X[:, :4].sum(axis=1))
+    df["red"], df["abs_hld"], df["cost"] = F[:, 0], F[:, 1], F[:, 2]
+    df["fp"] = np.where(np.isfinite(F[:, 3]), -F[:, 3], np.nan)
+    return df.sort_values("cost").reset_index(drop=True)
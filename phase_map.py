@@ -0,0 +1,47 @@
+import numpy as np
+
+from engine import HLD_T_REF, STORE, hld_array, optimal_salinity
+
+# --- 1. SCAN AXES ---
+SCAN_SALINITY = np.linspace(0.0, 10.0, 201)  # % NaCl, the sidebar salinity range
+SCAN_TEMP = np.linspace(5.0, 85.0, 161)      # °C
+SCAN_EACN = np.linspace(0.0, 20.0, 161)      # oil-phase EACN
+
+def surfactant_table(names=None, store=None):
+    """Names, cc and anionic flags of the given surfactants (all of them by default)."""
+    T = (STORE if store is None else store)["Surfactants"]
+    ids = np.arange(len(T["ids"])) if names is None else np.array([T["index"][n] for n in names])
+    return [T["names"][i] for i in ids], T["cc"][ids], T["anionic"][ids]
+
+def _optimum(s_opt, salinity):
+    """HLD = 0 salinities, NaN where they fall outside the scanned range."""
+    return np.where((s_opt >= salinity.min()) & (s_opt <= salinity.max()), s_opt, np.nan)
+
+# --- 2. PHASE MAPS ---
+def salinity_temperature_map(oil_eacn, surfactants=None, salinity=SCAN_SALINITY, temp=SCAN_TEMP):
+    """HLD over a temperature × salinity grid for each surfactant.
+
+    Returns a dict with the axes, the surfactant names, `hld` of shape
+    (n_surfactants, len(temp), len(salinity)) and `optimum`, the HLD = 0
+    salinity per surfactant and temperature (n_surfactants, len(temp)).
+    """
+    names, cc, anionic = surfactant_table(surfactants)
+    sf = (slice(None), None, None)
+    hld = hld_array(salinity[None, None, :], oil_eacn, cc[sf], anionic[sf], temp[None, :, None])
+    opt = optimal_salinity(oil_eacn, cc[:, None], anionic[:, None], temp[None, :])
+    return {"salinity": salinity, "temp": temp, "names": names, "hld": hld, "optimum": _optimum(opt, salinity)}
+
+def salinity_eacn_map(temp=HLD_T_REF, surfactants=None, salinity=SCAN_SALINITY, eacn=SCAN_EACN):
+    """HLD over an oil EACN × salinity grid at one temperature for each surfactant.
+
+    Same layout as salinity_temperature_map() with `eacn` in place of `temp`.
+    """
+    names, cc, anionic = surfactant_table(surfactants)
+    sf = (slice(None), None, None)
+    hld = hld_array(salinity[None, None, :], eacn[None, :, None], cc[sf], anionic[sf], temp)
+    opt = optimal_salinity(eacn[None, :], cc[:, None], anionic[:, None], temp)
+    return {"salinity": salinity, "eacn": eacn, "names": names, "hld": hld, "optimum": _optimum(opt, salinity)}
+
+def winsor_type(hld, window=0.5):
+    """Winsor type per grid point: 1 (o/w, HLD < -window), 3 (bicontinuous) or 2 (w/o, HLD > window)."""
+    return np.where(hld < -window, 1, np.where(hld > window, 2, 3)).astype(np.int8)
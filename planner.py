@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from engine import RECORD_DEFAULTS, RECORD_KEYS, RECORD_NUMS, score_records
+
+# --- 1. PLANNING CONSTANTS ---
+SETUP_H = 1.0           # cleaning / charging time per lot, hours
+FILL_RATE_LPH = 2000.0  # vessel throughput while weighing in and mixing, litres per hour
+BRINE_CONC = 15.0       # default brine stock strength, % NaCl w/w (the Manufacturing tab default)
+BRINE_TANK_KG = 1000.0  # largest brine stock prepared in one run
+SALT = "NaCl"
+
+SLOTS = ["solvent", "cosolvent", "surfactant", "cosurfactant"]  # RECORD_KEYS weighed as-is, in PHASES order
+
+# --- 2. LOTS AND VESSELS ---
+def _split_lots(schedule, max_capacity):
+    """Lots larger than the biggest vessel become several sub-lots of equal volume."""
+    n = np.maximum(1, np.ceil(schedule["volume_l"].to_numpy(dtype=float) / max_capacity)).astype(int)
+    lots = schedule.loc[schedule.index.repeat(n)].copy()
+    lots["part"] = lots.groupby(level=0).cumcount() + 1
+    lots["volume_l"] = lots["volume_l"] / np.repeat(n, n)
+    lots["lot"] = np.where(np.repeat(n, n) > 1, lots["lot"].astype(str) + "/" + lots["part"].astype(str), lots["lot"].astype(str))
+    return lots.drop(columns="part").reset_index(drop=True)
+
+def assign_vessels(lots, vessels, start):
+    """Earliest-due-date list scheduling: each lot goes to the vessel that can finish it first,
+    the smallest one on ties. Returns vessel, start and end columns aligned with `lots`."""
+    names = list(vessels)
+    cap = np.array([vessels[v] for v in names], dtype=float)
+    free = np.full(len(names), 0.0)  # hours from `start` at which each vessel is free
+    order = np.lexsort((-lots["volume_l"].to_numpy(), lots["due"].to_numpy()))
+    vessel, t0, t1 = np.empty(len(lots), dtype=object), np.empty(len(lots)), np.empty(len(lots))
+    for i in order:
+        vol = lots["volume_l"].iat[i]
+        ok = np.flatnonzero(cap >= vol - 1e-9)
+        dur = SETUP_H + vol / FILL_RATE_LPH
+        j = ok[np.lexsort((cap[ok], free[ok]))[0]]
+        vessel[i], t0[i], t1[i] = names[j], free[j], free[j] + dur
+        free[j] += dur
+    return vessel, start + pd.to_timedelta(t0, unit="h"), start + pd.to_timedelta(t1, unit="h")
+
+# --- 3. PLAN ---
+def plan_production(schedule, vessels, stock=None, start=None, brine_tank_kg=BRINE_TANK_KG):
+    """Weighing sheets, raw-material demand, brine runs and a vessel assignment for a schedule of lots.
+
+    `schedule` has one row per lot: lot, the RECORD_KEYS component keys, the
+    RECORD_NUMS w/w % and salinity, volume_l, due and optionally brine_conc.
+    `vessels` maps vessel names to capacities in litres and `stock` raw
+    material names to kg on hand. All lots are scored in one vectorised call.
+    Returns a dict of DataFrames: lots, weighing, demand and brine.
+    """
+    sch = schedule.copy().reset_index(drop=True)
+    for k, v in {**RECORD_DEFAULTS, "brine_conc": BRINE_CONC}.items():
+        sch[k] = sch[k].fillna(v) if k in sch else v
+    if "lot" not in sch: sch["lot"] = np.arange(1, len(sch) + 1)
+    sch["due"] = pd.to_datetime(sch["due"])
+    start = pd.Timestamp.now().floor("h") if start is None else pd.Timestamp(start)
+
+    lots = _split_lots(sch, max(vessels.values()))
+    r = score_records(lots[RECORD_KEYS].astype(str).to_numpy(dtype=object), lots[RECORD_NUMS].to_numpy(dtype=float))
+    if not r["valid"].all():
+        bad = lots.loc[~r["valid"], "lot"].tolist()
+        raise KeyError(f"lots with unknown component keys: {', '.join(map(str, bad))}")
+
+    # Per-lot weighing, as in the Manufacturing tab: kg of each slot plus brine stock and make-up water
+    pct = lots[RECORD_NUMS].to_numpy(dtype=float)
+    total_kg = lots["volume_l"].to_numpy() * r["rho"] / 1000
+    kg = total_kg[:, None] * pct[:, :5] / 100
+    brine_kg = total_kg * pct[:, 5] / 100 / (lots["brine_conc"].to_numpy(dtype=float) / 100)
+    water_kg = kg[:, 4] - brine_kg
+
+    lots["vessel"], lots["start"], lots["end"] = assign_vessels(lots, vessels, start)
+    lots["total_kg"], lots["cost"] = total_kg, r["cost"] * total_kg
+    lots["brine_kg"], lots["water_kg"] = brine_kg, water_kg
+    lots["late_h"] = np.maximum(0.0, (lots["end"] - lots["due"]).dt.total_seconds() / 3600)
+    lots["brine_error"] = water_kg < 0
+
+    n = len(lots)
+    names = [lots[k].to_numpy(dtype=object) for k in SLOTS]
+    weighing = pd.DataFrame({
+        "lot": np.tile(lots["lot"].to_numpy(dtype=object), 6),
+        "vessel": np.tile(lots["vessel"].to_numpy(dtype=object), 6),
+        "step": np.repeat([1, 2, 3, 4, 5, 5], n),
+        "component": np.concatenate(names + [np.array([f"Brine {c:g}%" for c in lots["brine_conc"]], dtype=object),
+                                             lots["aqueous"].to_numpy(dtype=object)]),
+        "kg": np.concatenate([kg[:, j] for j in range(4)] + [brine_kg, water_kg]),
+    })
+    weighing = weighing[weighing["kg"] > 0].sort_values(["lot", "step"], kind="stable").reset_index(drop=True)
+
+    brine = brine_runs(lots, brine_tank_kg)
+    demand = pd.concat([
+        pd.DataFrame({"material": np.concatenate(names), "kg": kg[:, :4].T.ravel()}),
+        pd.DataFrame({"material": lots["aqueous"], "kg": np.maximum(water_kg, 0)}),
+        pd.DataFrame({"material": brine["water_source"], "kg": brine["water_kg"]}),
+        pd.DataFrame({"material": SALT, "kg": brine["salt_kg"]}),
+    ])
+    demand = demand[demand["kg"] > 0].groupby("material", as_index=False, sort=True)["kg"].sum()
+    stock = stock or {}
+    demand["stock_kg"] = demand["material"].map(stock).fillna(0.0)
+    demand["shortfall_kg"] = np.maximum(0.0, demand["kg"] - demand["stock_kg"])
+    return {"lots": lots, "weighing": weighing, "demand": demand, "brine": brine}
+
+def brine_runs(lots, tank_kg=BRINE_TANK_KG):
+    """Brine stock preparation runs: lots grouped by stock strength and water source, in start order,
+    each run filled up to `tank_kg` and ready before the first lot it serves."""
+    need = lots[lots["brine_kg"] > 0].sort_values("start", kind="stable")
+    runs = []
+    for (conc, water), grp in need.groupby(["brine_conc", "aqueous"], sort=False):
+        run = {"kg": 0.0, "lots": [], "needed_by": None}
+        for lot, kg, t in zip(grp["lot"], grp["brine_kg"], grp["start"]):
+            while kg > 1e-9:
+                take = min(kg, tank_kg - run["kg"])
+                run["kg"] += take
+                kg -= take
+                run["lots"].append(str(lot))
+                run["needed_by"] = run["needed_by"] or t
+                if run["kg"] >= tank_kg - 1e-9:
+                    runs.append((conc, water, run))
+                    run = {"kg": 0.0, "lots": [], "needed_by": None}
+        if run["kg"] > 0: runs.append((conc, water, run))
+    df = pd.DataFrame([{"brine_conc": c, "water_source": w, "kg": run["kg"], "salt_kg": run["kg"] * c / 100,
+                        "water_kg": run["kg"] * (1 - c / 100), "needed_by": run["needed_by"],
+                        "lots": ", ".join(dict.fromkeys(run["lots"]))} for c, w, run in runs],
+                      columns=["brine_conc", "water_source", "kg", "salt_kg", "water_kg", "needed_by", "lots"])
+    df = df.sort_values("needed_by", kind="stable").reset_index(drop=True)
+    df.insert(0, "run", np.arange(1, len(df) + 1))
+    return df
+
+def parse_vessels(text):
+    """'R1:2000, R2:5000' or '2000, 5000' -> {name: litres}."""
+    vessels = {}
+    for i, item in enumerate(t.strip() for t in text.split(",") if t.strip()):
+        name, _, cap = item.rpartition(":")
+        vessels[name.strip() or f"V{i + 1}"] = float(cap)
+    if not vessels or not all(math.isfinite(c) and c > 0 for c in vessels.values()):
+        raise ValueError("vessel capacities must be positive numbers")
+    return vessels
@@ -0,0 +1,152 @@
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from engine import STORE
+from hansen_index import INDEX, resin_members
+
+# --- 1. PRECOMPUTED GEOMETRY (built once per process, shared by every session) ---
+# Level of detail of the Hansen figure: sphere mesh resolution, which axes carry contour
+# lines, how many database points each trace draws (beyond that they are voxel-decimated)
+# and up to how many points a trace keeps text labels (otherwise names show on hover only).
+LOD = {
+    "low": {"sphere": (16, 8), "contours": (), "points": 2_000, "labels": 0},
+    "medium": {"sphere": (24, 12), "contours": ("z",), "points": 10_000, "labels": 40},
+    "high": {"sphere": (40, 20), "contours": ("x", "y", "z"), "points": 50_000, "labels": 200},
+}
+DEFAULT_LOD = "high"
+SPHERE_RES = LOD[DEFAULT_LOD]["sphere"]
+# Initial level for the app: full detail unless the library is too large for the medium point budget
+APP_LOD = DEFAULT_LOD if INDEX["tree"].n <= LOD["medium"]["points"] else "medium"
+MESH_DECIMALS = 2  # mesh and point coordinates are rounded before they go into the figure JSON
+
+def _unit_sphere(n_u, n_v):
+    u, v = np.mgrid[0:2*np.pi:complex(n_u), 0:np.pi:complex(n_v)]
+    return np.stack([np.cos(u) * np.sin(v), np.sin(u) * np.sin(v), np.cos(v)])
+
+UNIT_SPHERES = {k: _unit_sphere(*v["sphere"]) for k, v in LOD.items()}
+UNIT_SPHERE = UNIT_SPHERES[DEFAULT_LOD]
+
+@lru_cache(maxsize=256)
+def sphere_mesh(hsp, r0, lod=DEFAULT_LOD):
+    """(3, n_u, n_v) surface coordinates of a Hansen sphere; `hsp` must be a tuple."""
+    return np.round(r0 * UNIT_SPHERES[lod] + np.array(hsp)[:, None, None], MESH_DECIMALS)
+
+def decimate(points, budget):
+    """Indices of at most `budget` representative rows of an (n, 3) point cloud, and how many rows each stands for.
+
+    Points are binned on a cubic voxel grid, coarsened until the occupied
+    cells fit the budget; the first point of each cell represents it.
+    """
+    n = len(points)
+    if n <= budget: return np.arange(n), np.ones(n, dtype=int)
+    lo, span = points.min(axis=0), np.ptp(points, axis=0)
+    cell = max(float(np.prod(np.maximum(span, 1e-9)) / budget)**(1 / 3), 1e-9)
+    while True:
+        _, first, counts = np.unique(np.floor((points - lo) / cell).astype(np.int64), axis=0,
+                                     return_index=True, return_counts=True)
+        if len(first) <= budget: return first, counts
+        cell *= 1.25
+
+def _db_points(res_id):
+    """Indexed solvents and cosolvents split into inside / outside a resin sphere via the KD-tree."""
+    inside = np.zeros(INDEX["tree"].n, dtype=bool)
+    inside[resin_members(res_id)[0]] = True
+    return {"in": np.flatnonzero(inside), "out": np.flatnonzero(~inside)}
+
+def db_trace_points(rows, lod):
+    """x, y, z, hover names and whether to print labels for one side of a resin's database points at `lod`."""
+    spec = LOD[lod]
+    keep, counts = decimate(INDEX["hsp"][rows], spec["points"])
+    hsp = np.round(INDEX["hsp"][rows[keep]], MESH_DECIMALS)
+    names = INDEX["names"][rows[keep]]
+    names = np.where(counts > 1, [f"{n} (+{c - 1})" for n, c in zip(names, counts)], names) if len(keep) < len(rows) else names
+    return (*hsp.T.tolist(), names.tolist(), len(keep) <= spec["labels"])
+
+_RES = STORE["Resins"]
+RESIN_DB_POINTS = {k: _db_points(i) for i, k in enumerate(_RES["names"])}
+
+# --- 2. FIGURES ---
+CURRENT_TRACE = 3  # position of the "Current Formulation" marker in hansen_figure
+
+def hansen_figure(res_k, target_label, current_label, center_label, lod=DEFAULT_LOD):
+    """3D Hansen figure for a stored resin with a placeholder formulation marker.
+
+    Only set_current_point() needs to run on later reruns. The figure is
+    rebuilt from hansen_figure_json(), so its static traces are computed and
+    serialized once per process and shared by every session.
+    """
+    return pio.from_json(hansen_figure_json(res_k, target_label, current_label, center_label, lod))
+
+@lru_cache(maxsize=64)
+def hansen_figure_json(res_k, target_label, current_label, center_label, lod=DEFAULT_LOD):
+    """Serialized hansen_figure() at a LOD level."""
+    return pio.to_json(_build_figure(res_k, target_label, current_label, center_label, lod), validate=False)
+
+def _build_figure(res_k, target_label, current_label, center_label, lod):
+    i = _RES["index"][res_k]
+    R = {"hsp": _RES["hsp"][i].tolist(), "r0": float(_RES["r0"][i])}
+    x_s, y_s, z_s = sphere_mesh(tuple(R["hsp"]), R["r0"], lod)
+    pts = {side: db_trace_points(rows, lod) for side, rows in RESIN_DB_POINTS[res_k].items()}
+    fig = go.Figure()
+
+    # Resin Sphere Surface
+    fig.add_trace(go.Surface(x=x_s, y=y_s, z=z_s, opacity=0.4, showscale=False, colorscale=[[0, '#38bdf8'], [1, '#38bdf8']],
+        contours={a: dict(show=True, color="white", width=1) for a in LOD[lod]["contours"]},
+        name=f"{target_label}: {res_k}", showlegend=True))
+
+    # Plot In-Sphere Solvents (Red)
+    fig.add_trace(go.Scatter3d(x=pts["in"][0], y=pts["in"][1], z=pts["in"][2],
+                               mode='markers+text' if pts["in"][4] else 'markers',
+                               marker=dict(size=5, color='#ef4444', opacity=0.9),
+                               text=pts["in"][3], textposition="top center",
+                               textfont=dict(size=10, color="white"),
+                               hoverinfo='text', name="Soluble DB Components"))
+
+    # Plot Out-Sphere Solvents (Blue)
+    fig.add_trace(go.Scatter3d(x=pts["out"][0], y=pts["out"][1], z=pts["out"][2],
+                               mode='markers+text' if pts["out"][4] else 'markers',
+                               marker=dict(size=5, color='#3b82f6', opacity=0.7),
+                               text=pts["out"][3], textposition="top center",
+                               textfont=dict(size=10, color="#94a3b8"),
+                               hoverinfo='text', name="Insoluble DB Components"))
+
+    # Current Formulation Point
+    fig.add_trace(go.Scatter3d(x=[R['hsp'][0]], y=[R['hsp'][1]], z=[R['hsp'][2]],
+                               mode='markers+text',
+                               marker=dict(size=14, color='#fbbf24', symbol='diamond', line=dict(color='white', width=2)),
+                               text=[current_label], textposition="bottom center",
+                               textfont=dict(size=12, color="white"),
+                               hoverinfo='text', name=current_label))
+
+    # Resin Center
+    fig.add_trace(go.Scatter3d(x=[R['hsp'][0]], y=[R['hsp'][1]], z=[R['hsp'][2]], mode='markers',
+                               marker=dict(size=8, color='white'),
+                               text=[f"{res_k} {center_label}"], hoverinfo='text',
+                               name=f"{res_k} {center_label}"))
+
+    ctr, rv = R['hsp'], R['r0'] + 5
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        hovermode='closest',
+        uirevision=res_k,  # keep the camera while only the formulation marker moves
+        hoverlabel=dict(bgcolor="#1e293b", font_size=14, font_family="Inter"),
+        scene=dict(
+            xaxis=dict(title='δD', range=[ctr[0]-rv, ctr[0]+rv], gridcolor="#475569"),
+            yaxis=dict(title='δP', range=[ctr[1]-rv, ctr[1]+rv], gridcolor="#475569"),
+            zaxis=dict(title='δH', range=[ctr[2]-rv, ctr[2]+rv], gridcolor="#475569"),
+            aspectmode='cube', bgcolor="#0f172a"
+        ),
+        margin=dict(l=0, r=0, b=0, t=0),
+        legend=dict(x=0.02, y=0.98, font=dict(color="white"), bgcolor="rgba(15, 23, 42, 0.8)")
+    )
+    return fig
+
+def set_current_point(fig, h_mix):
+    """Move the formulation marker of a hansen_figure in place; the rest of the figure is reused as is."""
+    h = np.round(np.asarray(h_mix, dtype=float), MESH_DECIMALS).tolist()
+    fig.data[CURRENT_TRACE].update(x=[h[0]], y=[h[1]], z=[h[2]])
+    return fig
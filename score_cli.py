@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import RECORD_DEFAULTS, RECORD_KEYS, RECORD_NUMS, STORE, score_records
+
+# Batch scorer for formulation files (CSV or Parquet in, CSV or Parquet out), read and written in
+# fixed-size chunks so memory stays flat. Imports neither Streamlit nor Plotly.
+#   python score_cli.py formulations.csv scored.parquet --chunk-size 200000
+CHUNK_ROWS = 100_000
+OUTPUTS = ["red", "hld", "rho", "fp", "cost", "oil_eacn"]
+
+def _fmt(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".csv", ".parquet", ".pq"):
+        raise SystemExit(f"unsupported file type: {path} (use .csv or .parquet)")
+    return "parquet" if ext in (".parquet", ".pq") else "csv"
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """DataFrames of at most `chunk_rows` rows from a CSV or Parquet file."""
+    if _fmt(path) == "csv":
+        # Only blank cells are missing: "None" is a database key (no cosolvent), not NA
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype={k: str for k in RECORD_KEYS},
+                               keep_default_na=False, na_values=[""])
+        return
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+def score_frame(df):
+    """Score one chunk: the input columns plus the model outputs, the mixture HSP, GHS codes and an error flag."""
+    for k, v in RECORD_DEFAULTS.items():
+        df[k] = df[k].fillna(v) if k in df else v
+    missing = [k for k in RECORD_KEYS + RECORD_NUMS if k not in df]
+    if missing:
+        raise SystemExit(f"missing columns: {', '.join(missing)}")
+    keys = df[RECORD_KEYS].fillna("").astype(str).to_numpy(dtype=object)
+    nums = df[RECORD_NUMS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    bad_num = ~np.isfinite(nums).all(axis=1)  # blank or non-numeric cells
+    r = score_records(keys, np.where(bad_num[:, None], [0, 0, 0, 0, 100, 0], nums))  # placeholder: pure aqueous phase
+    out = df.copy()
+    bad = bad_num | ~r["valid"]
+    for k in OUTPUTS:
+        out[k] = np.where(bad, np.nan, r[k])
+    for j, k in enumerate(["h_d", "h_p", "h_h"]):
+        out[k] = np.where(bad, np.nan, r["h_mix"][:, j])
+    codes = np.array(STORE["ghs_codes"], dtype=object)
+    out["ghs"] = ["" if b else " ".join(codes[m]) for b, m in zip(bad, r["ghs"])]
+    out["error"] = np.where(bad_num, "bad number", np.where(bad, "unknown component key", ""))
+    return out
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file as they arrive."""
+
+    def __init__(self, path):
+        self.path, self.fmt, self._pq = path, _fmt(path), None
+        self._first = True
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq is None: self._pq = pq.ParquetWriter(self.path, table.schema)
+            self._pq.write_table(table.cast(self._pq.schema))
+        self._first = False
+
+    def close(self):
+        if self._pq is not None: self._pq.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Score a file of microemulsion formulations.")
+    ap.add_argument("input", help="CSV or Parquet with columns " + ", ".join(RECORD_KEYS + RECORD_NUMS))
+    ap.add_argument("output", help="CSV or Parquet file to write")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_ROWS)
+    a = ap.parse_args(argv)
+    writer, n, t0 = ChunkWriter(a.output), 0, time.perf_counter()
+    try:
+        for df in read_chunks(a.input, a.chunk_size):
+            writer.write(score_frame(df))
+            n += len(df)
+            print(f"\r{n:,} rows", end="", file=sys.stderr)
+    finally:
+        writer.close()
+    print(f"\r{n:,} rows scored in {time.perf_counter() - t0:.1f} s -> {a.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from clp import classify_batch, hazard_labels
+from engine import PHASES, STORE, evaluate_batch
+
+# Combination axes: resin first, then the five formulation slots in PHASES order
+AXES = ["Resins"] + PHASES
+
+def composition_grid(sur=(5, 10, 15, 20), alc=(2, 5, 10), sol=(10, 20, 30, 40), cos=(0, 5, 10),
+                     salinities=(0.5,), min_water=10.0, max_water=90.0):
+    """All w/w points (p_sol, p_cos, p_sur, p_alc, p_wat, salinity) whose water balance is within bounds."""
+    g = np.array(np.meshgrid(sol, cos, sur, alc, salinities, indexing="ij")).reshape(5, -1).T
+    p_wat = 100 - g[:, :4].sum(axis=1)
+    keep = (p_wat >= min_water) & (p_wat <= max_water)
+    return np.column_stack([g[keep, :4], p_wat[keep], g[keep, 4]])
+
+def combination_shape(store=None):
+    T = STORE if store is None else store
+    return tuple(len(T[a]["ids"]) for a in AXES)
+
+def _top_k_per_resin(score, resin, ids, top_k, n_resins):
+    """Keep the best `top_k` (score, id) pairs for each resin."""
+    keep = []
+    for r in range(n_resins):
+        rows = np.flatnonzero(resin == r)
+        if len(rows) > top_k:
+            rows = rows[np.argpartition(score[rows], top_k - 1)[:top_k]]
+        keep.append(rows)
+    keep = np.concatenate(keep)
+    return score[keep], ids[keep]
+
+def _screen_chunk(start, stop, grid, weights, top_k):
+    """Evaluate combinations [start, stop) against every grid point; keep the per-resin best."""
+    shape = combination_shape()
+    combo = np.arange(start, stop)
+    n_g = len(grid)
+    c = np.repeat(combo, n_g)
+    g = np.tile(np.arange(n_g), len(combo))
+    ix = np.unravel_index(c, shape)
+    idx = np.column_stack(ix[1:])
+    res = evaluate_batch(grid[g, :5], idx, ix[0], grid[g, 5])
+    score = weights[0] * res["red"] + weights[1] * np.abs(res["hld"]) + weights[2] * res["cost"]
+    score = np.where(np.isfinite(score), score, np.inf)
+    return _top_k_per_resin(score, ix[0], c * n_g + g, top_k, shape[0])
+
+def screen_all(grid=None, weights=(1.0, 1.0, 0.1), top_k=10, chunk_rows=200_000, n_jobs=None, progress=None):
+    """Rank every component combination in DATA_FULL over a w/w grid.
+
+    Combinations are streamed in chunks of about `chunk_rows` evaluations so
+    memory stays bounded, and chunks are spread over a process pool. The score
+    is weights[0]*RED + weights[1]*|HLD| + weights[2]*cost (€/kg); the best
+    `top_k` formulations per resin are returned as a DataFrame.
+    `progress(done, total, best_row)` is called as each chunk finishes.
+    """
+    grid = composition_grid() if grid is None else np.asarray(grid, dtype=float)
+    shape = combination_shape()
+    n_combos = int(np.prod(shape))
+    step = max(1, chunk_rows // len(grid))
+    bounds = [(s, min(s + step, n_combos)) for s in range(0, n_combos, step)]
+    args = (grid, np.asarray(weights, dtype=float), top_k)
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    parts = []
+
+    def collect(part):
+        parts.append(part)
+        if progress is not None:
+            best = min((p for p in parts if len(p[0])), key=lambda p: p[0].min(), default=None)
+            if best is not None:
+                j = [np.argmin(best[0])]
+                best = screening_table(best[1][j], best[0][j], grid)
+            progress(len(parts), len(bounds), best)
+
+    if n_jobs == 1:
+        for a, b in bounds: collect(_screen_chunk(a, b, *args))
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_jobs)
+        try:
+            for f in as_completed([pool.submit(_screen_chunk, a, b, *args) for a, b in bounds]):
+                collect(f.result())
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    score = np.concatenate([p[0] for p in parts])
+    ids = np.concatenate([p[1] for p in parts])
+    combo, g = np.divmod(ids, len(grid))
+    resin = np.unravel_index(combo, shape)[0]
+    score, ids = _top_k_per_resin(score, resin, ids, top_k, shape[0])
+    return screening_table(ids, score, grid)
+
+def screening_table(ids, score, grid):
+    """Expand flat (combination, grid point) ids into a ranked table."""
+    shape = combination_shape()
+    combo, g = np.divmod(ids, len(grid))
+    ix = np.unravel_index(combo, shape)
+    res = evaluate_batch(grid[g, :5], np.column_stack(ix[1:]), ix[0], grid[g, 5])
+    df = pd.DataFrame({a: np.array(STORE[a]["names"], dtype=object)[i] for a, i in zip(AXES, ix)})
+    for j, col in enumerate(["p_sol", "p_cos", "p_sur", "p_alc", "p_wat", "salinity"]):
+        df[col] = grid[g, j]
+    df["red"], df["hld"], df["cost"] = res["red"], res["hld"], res["cost"]
+    df["rho"], df["fp"], df["score"] = res["rho"], res["fp"], score
+    haz = classify_batch(np.column_stack(ix[1:]), grid[g, :5] / 100, res["fp"])
+    df["hazards"], df["signal"] = hazard_labels(haz["hazards"]), haz["signal"]
+    df = df[np.isfinite(df["score"])].sort_values(["Resins", "score"], kind="stable")
+    df["rank"] = df.groupby("Resins").cumcount() + 1
+    return df.reset_index(drop=True)
@@ -0,0 +1,131 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+from engine import batch_params, evaluate_params, formulation_index, index_batch
+
+# --- 1. FACTORS ---
+# Each factor varies uniformly within ± this half-width of the formulation's own value:
+# salinity in % NaCl, cc and eacn in HLD units, phase shares in w/w points (never below zero,
+# so an absent phase stays absent). Water takes the balance, as with the sidebar sliders.
+SOBOL_RANGES = {"salinity": 0.5, "cc": 0.3, "eacn": 1.0, "p_sol": 2.0, "p_cos": 2.0, "p_sur": 2.0, "p_alc": 2.0}
+SOBOL_OUTPUTS = ["hld", "red", "rho", "fp"]
+SOBOL_SAMPLES = 1024       # base sample size N (a power of two); one formulation costs N * (d + 2) evaluations
+SOBOL_MIN_SAMPLES = 64     # catalogue runs never go below this N
+SOBOL_BUDGET = 20_000_000  # model evaluations a catalogue run may spend in total
+SOBOL_CHUNK_EVALS = 500_000  # evaluations per vectorised call
+_SLOTS = {"p_sol": 0, "p_cos": 1, "p_sur": 2, "p_alc": 3}
+
+def sobol_design(d, n=SOBOL_SAMPLES, seed=0):
+    """(N, 2d) scrambled Sobol' points in [0, 1); the first d columns give A, the last d give B."""
+    return qmc.Sobol(2 * d, scramble=True, seed=seed).random_base2(int(np.ceil(np.log2(n))))
+
+def sample_matrices(U, lo, hi):
+    """Saltelli A, B and A_B^(i) stacked as (R, N * (d + 2), d) factor values for R (d,) boxes lo..hi."""
+    N, d = len(U), U.shape[1] // 2
+    lo, hi = np.atleast_2d(lo)[:, None], np.atleast_2d(hi)[:, None]
+    A, B = lo + U[:, :d] * (hi - lo), lo + U[:, d:] * (hi - lo)
+    AB = np.repeat(A[:, None], d, axis=1)  # (R, d, N, d)
+    AB[:, np.arange(d), :, np.arange(d)] = np.moveaxis(B, 2, 0)
+    return np.concatenate([A, B, AB.reshape(len(A), d * N, d)], axis=1)
+
+def sobol_indices(yA, yB, yAB):
+    """First-order (Saltelli 2010) and total (Jansen) indices from (R, N) outputs on A, B and (R, d, N) on A_B^(i).
+
+    Outputs that do not vary get zero indices.
+    """
+    var = np.var(np.concatenate([yA, yB], axis=-1), axis=-1)[:, None]
+    s1 = np.mean(yB[:, None] * (yAB - yA[:, None]), axis=-1)
+    st = 0.5 * np.mean((yA[:, None] - yAB)**2, axis=-1)
+    ok = var > 1e-12 * np.maximum(1, np.mean(yA, axis=-1, keepdims=True)**2)
+    return np.divide(s1, var, out=np.zeros_like(s1), where=ok), np.divide(st, var, out=np.zeros_like(st), where=ok)
+
+def _model(X, factors, pcts, salinity, base):
+    """(R, M) outputs at the (R, M, d) factor values of R formulations with gathered parameters `base`."""
+    R, m, _ = X.shape
+    col = {f: X[..., j].ravel() for j, f in enumerate(factors)}
+    p = {k: np.repeat(v, m, axis=0) for k, v in base.items()}
+    if "cc" in col: p["cc"] = col["cc"]
+    if "eacn" in col: p["eacn_sol"] = col["eacn"]
+    w = np.repeat(pcts, m, axis=0)
+    for f, j in _SLOTS.items():
+        if f in col: w[:, j] = col[f]
+    w[:, 4] = 100 - w[:, :4].sum(axis=1)
+    sal = col["salinity"] if "salinity" in col else np.repeat(salinity, m)
+    r = evaluate_params(w, sal, p)
+    return {k: r[k].reshape(R, m) for k in SOBOL_OUTPUTS}
+
+# --- 2. INDICES ---
+def _indices(idx, res_idx, nums, U, ranges):
+    """(R, len(SOBOL_OUTPUTS), d, 2) S1 / ST for R formulations given by store ids and RECORD_NUMS rows."""
+    nums = np.atleast_2d(nums)
+    base = batch_params(idx, res_idx, len(nums))
+    nominal = {"salinity": nums[:, 5], "cc": base["cc"], "eacn": base["eacn_sol"],
+               **{f: nums[:, j] for f, j in _SLOTS.items()}}
+    factors = list(ranges)
+    center = np.column_stack([nominal[f] for f in factors]).astype(float)
+    half = np.column_stack([np.full(len(nums), float(ranges[f])) for f in factors])
+    lo = np.where([f in _SLOTS or f == "salinity" for f in factors], np.maximum(center - half, 0), center - half)
+    X = sample_matrices(U, lo, center + (center - lo))
+    y = _model(X, factors, nums[:, :5].astype(float), nums[:, 5], base)
+    N, d = len(U), len(factors)
+    out = np.empty((len(nums), len(SOBOL_OUTPUTS), d, 2))
+    for k, key in enumerate(SOBOL_OUTPUTS):
+        yk = y[key]
+        out[:, k, :, 0], out[:, k, :, 1] = sobol_indices(yk[:, :N], yk[:, N:2 * N], yk[:, 2 * N:].reshape(-1, d, N))
+    return out
+
+def sensitivity(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, pcts, salinity, n=SOBOL_SAMPLES, ranges=None, seed=0):
+    """First-order (S1) and total (ST) Sobol indices of HLD, RED, density and flash point.
+
+    `pcts` are the five w/w % in PHASES order. Returns {output: DataFrame}
+    with one row per SOBOL_RANGES factor; the whole analysis is a single
+    vectorised call of n * (d + 2) evaluations.
+    """
+    res_idx, idx = formulation_index(res_k, sol_k, cos_k, sur_k, alc_k, wat_k)
+    ranges = SOBOL_RANGES if ranges is None else ranges
+    U = sobol_design(len(ranges), n, seed)
+    s = _indices(idx[None], [res_idx], np.r_[np.asarray(pcts, dtype=float), salinity], U, ranges)[0]
+    return {key: pd.DataFrame(s[k], index=list(ranges), columns=["S1", "ST"]) for k, key in enumerate(SOBOL_OUTPUTS)}
+
+# --- 3. CATALOGUE ---
+def _chunk(idx, res_idx, nums, U, ranges):
+    step = max(1, SOBOL_CHUNK_EVALS // (len(U) * (len(ranges) + 2)))
+    return np.concatenate([_indices(idx[a:a + step], res_idx[a:a + step], nums[a:a + step], U, ranges)
+                           for a in range(0, len(nums), step)])
+
+def catalogue_sensitivity(keys, nums, n=SOBOL_SAMPLES, ranges=None, budget=SOBOL_BUDGET, n_jobs=None, seed=0):
+    """Sobol indices for N tabular formulations (RECORD_KEYS keys and RECORD_NUMS numbers).
+
+    The base sample size drops to the largest power of two that keeps the
+    run within `budget` evaluations (never below SOBOL_MIN_SAMPLES), all
+    formulations share one quasi-random design, and blocks of formulations
+    are spread over a process pool. Returns a long DataFrame: row, output,
+    factor, S1, ST. Unknown keys raise KeyError.
+    """
+    ranges = SOBOL_RANGES if ranges is None else ranges
+    nums = np.asarray(nums, dtype=float).reshape(-1, 6)
+    res_idx, idx = index_batch(keys)
+    bad = np.flatnonzero((res_idx < 0) | np.any(idx < 0, axis=1))
+    if len(bad):
+        raise KeyError(f"rows with unknown component keys: {', '.join(map(str, bad[:10]))}")
+    rows, d = len(nums), len(ranges)
+    fit = budget / max(rows * (d + 2), 1)
+    n = int(min(n, max(SOBOL_MIN_SAMPLES, 2**np.floor(np.log2(max(fit, 1))))))
+    U = sobol_design(d, n, seed)
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    parts = np.array_split(np.arange(rows), min(rows, n_jobs)) if rows else []
+    args = [(idx[p], res_idx[p], nums[p], U, ranges) for p in parts]
+    if n_jobs == 1 or len(args) <= 1:
+        s = [_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=len(args)) as pool:
+            s = list(pool.map(_chunk, *zip(*args)))
+    s = np.concatenate(s) if s else np.empty((0, len(SOBOL_OUTPUTS), d, 2))
+    r, o, f = np.meshgrid(np.arange(rows), SOBOL_OUTPUTS, list(ranges), indexing="ij")
+    return pd.DataFrame({"row": r.ravel(), "output": o.ravel(), "factor": f.ravel(),
+                         "S1": s[..., 0].ravel(), "ST": s[..., 1].ravel()})
@@ -0,0 +1,105 @@
+import argparse
+import json
+import math
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from engine import PHASES, RECORD_DEFAULTS, RECORD_KEYS, RECORD_NUMS, STORE, score_records
+
+# Stand-alone HTTP/JSON scoring service (no Streamlit):
+#   GET  /health       -> database summary
+#   POST /score        -> one formulation object -> one result object
+#   POST /score/batch  -> JSON array (or NDJSON lines) of formulations -> NDJSON results in request order
+# A formulation carries the RECORD_KEYS component keys, the RECORD_NUMS w/w % and salinity, and an optional "id".
+BATCH_CHUNK = 4096  # rows scored per vectorised call while a batch streams out
+OUTPUTS = ["red", "hld", "rho", "fp", "cost", "oil_eacn"]
+
+def _num(v):
+    return v if math.isfinite(v) else None  # NaN / inf are not valid JSON
+
+def _results(records):
+    """Score a list of formulation dicts; one result dict (or {"id", "error"}) per record."""
+    keys, nums, errors = [], [], []
+    for rec in records:
+        try:
+            rec = {**RECORD_DEFAULTS, **rec}
+            k = [str(rec[f]) for f in RECORD_KEYS]
+            x = [float(rec[f]) for f in RECORD_NUMS]
+            error = None
+        except (KeyError, TypeError, ValueError) as e:
+            k, x, error = [""] * len(RECORD_KEYS), [0.0] * len(RECORD_NUMS), f"bad field {e}"
+        keys.append(k)
+        nums.append(x)
+        errors.append(error)
+    r = score_records(np.array(keys, dtype=object), nums)
+    cols = {k: r[k].tolist() for k in OUTPUTS}
+    h_mix, codes = r["h_mix"].round(4).tolist(), np.array(STORE["ghs_codes"], dtype=object)
+    out = []
+    for i, rec in enumerate(records):
+        row = {"id": rec.get("id") if isinstance(rec, dict) else None}
+        if errors[i] or not r["valid"][i]:
+            row["error"] = errors[i] or "unknown component key"
+        else:
+            row.update({k: _num(cols[k][i]) for k in OUTPUTS})
+            row["h_mix"] = h_mix[i]
+            row["ghs"] = codes[r["ghs"][i]].tolist()
+        out.append(row)
+    return out
+
+def _ndjson(records):
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in _results(records)).encode("utf-8")
+
+def _records(body, content_type):
+    """Formulations from a JSON array, a {"formulations": [...]} object or NDJSON lines."""
+    if "ndjson" in content_type:
+        records = [json.loads(line) for line in body.splitlines() if line.strip()]
+    else:
+        data = json.loads(body)
+        records = data["formulations"] if isinstance(data, dict) else data
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError("expected formulation objects")
+    return records
+
+async def health(request):
+    return JSONResponse({"status": "ok", "components": {cat: len(STORE[cat]["ids"]) for cat in ["Resins"] + PHASES}})
+
+async def score(request):
+    try:
+        rec = json.loads(await request.body())
+    except ValueError:
+        return JSONResponse({"error": "body is not JSON"}, status_code=400)
+    if not isinstance(rec, dict):
+        return JSONResponse({"error": "expected one formulation object"}, status_code=400)
+    row = (await run_in_threadpool(_results, [rec]))[0]
+    return JSONResponse(row, status_code=422 if "error" in row else 200)
+
+async def score_batch(request):
+    try:
+        records = _records(await request.body(), request.headers.get("content-type", ""))
+    except (ValueError, KeyError):
+        return JSONResponse({"error": "expected a JSON array, {\"formulations\": [...]} or NDJSON"}, status_code=400)
+
+    async def stream():
+        for a in range(0, len(records), BATCH_CHUNK):
+            yield await run_in_threadpool(_ndjson, records[a:a + BATCH_CHUNK])
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+app = Starlette(routes=[
+    Route("/health", health),
+    Route("/score", score, methods=["POST"]),
+    Route("/score/batch", score_batch, methods=["POST"]),
+])
+
+if __name__ == "__main__":
+    import uvicorn
+    ap = argparse.ArgumentParser(description="Microemulsion formulation scoring service")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8600)
+    ap.add_argument("--workers", type=int, default=1)
+    a = ap.parse_args()
+    uvicorn.run("service:app", host=a.host, port=a.port, workers=a.workers, timeout_keep_alive=75)
@@ -0,0 +1,107 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from component_db import build, read_csv, write_csv
+from engine import DEFAULT_DB, STORE, calculate_red
+
+FIT_STEP = 0.5   # coarse grid spacing of candidate centres, MPa^½
+FIT_REFINE = 3   # each refinement pass shrinks the grid spacing 4×
+FIT_MARGIN = 2.0  # candidate centres extend this far beyond the box of soluble solvents
+DEFAULT_CSV = os.path.join(os.path.dirname(DEFAULT_DB), "components.csv")
+
+def _classify(centers, hsp, soluble, chunk=4096):
+    """Misclassification count and smallest consistent R0 for every candidate centre.
+
+    For each centre the candidate radii are the Hansen distances of the
+    soluble solvents; the radius with the fewest errors wins, the smaller one
+    on ties. Returns (errors, r0), both of length len(centers).
+    """
+    errors, r0 = np.empty(len(centers), dtype=int), np.empty(len(centers))
+    for a in range(0, len(centers), chunk):
+        c = centers[a:a + chunk]
+        ra = calculate_red(hsp.T[:, None, :], {"hsp": c.T[:, :, None], "r0": 1.0})  # (C, n) Hansen distances
+        radii = ra[:, soluble]
+        inside = ra[:, None, :] <= radii[:, :, None]  # (C, radius, test)
+        err = np.sum(inside != soluble, axis=2)
+        best = np.lexsort((radii, err), axis=1)[:, 0]
+        rows = np.arange(len(c))
+        errors[a:a + chunk], r0[a:a + chunk] = err[rows, best], radii[rows, best]
+    return errors, r0
+
+def _grid(lo, hi, step):
+    axes = [np.arange(l, h + step / 2, step) for l, h in zip(lo, hi)]
+    return np.array(np.meshgrid(*axes, indexing="ij")).reshape(3, -1).T
+
+def fit_sphere(hsp, soluble, step=FIT_STEP, refine=FIT_REFINE, margin=FIT_MARGIN):
+    """Smallest Hansen sphere that best separates soluble from insoluble test solvents.
+
+    `hsp` is (n, 3) and `soluble` a length-n boolean. Candidate centres are
+    scored all at once on a grid over the box of the soluble solvents, then the
+    grid is refined around the best centre. Returns the centre, R0, the number
+    of misclassified tests and the fraction classified correctly.
+    """
+    hsp, soluble = np.asarray(hsp, dtype=float), np.asarray(soluble, dtype=bool)
+    if not soluble.any():
+        raise ValueError("a sphere fit needs at least one soluble solvent")
+    lo, hi = hsp[soluble].min(axis=0) - margin, hsp[soluble].max(axis=0) + margin
+    for _ in range(refine + 1):
+        centers = _grid(lo, hi, step)
+        errors, r0 = _classify(centers, hsp, soluble)
+        i = np.lexsort((r0, errors))[0]
+        lo, hi, step = centers[i] - step, centers[i] + step, step / 4
+    return {"hsp": np.round(centers[i], 2).tolist(), "r0": round(float(r0[i]), 2),
+            "errors": int(errors[i]), "fit": 1 - errors[i] / len(hsp)}
+
+def test_hsp(table, store=None):
+    """HSP of every test solvent: hsp_d/hsp_p/hsp_h columns when given, else looked up by name in the database."""
+    T = STORE if store is None else store
+    if {"hsp_d", "hsp_p", "hsp_h"} <= set(table.columns):
+        return table[["hsp_d", "hsp_p", "hsp_h"]].to_numpy(dtype=float)
+    known = {n: col["hsp"][i] for cat, col in T.items() if cat not in ("ghs_codes", "Resins") for i, n in enumerate(col["names"])}
+    missing = sorted(set(table["solvent"]) - set(known))
+    if missing:
+        raise KeyError(f"test solvents not in the component database: {', '.join(missing)}")
+    return np.array([known[n] for n in table["solvent"]], dtype=float)
+
+def _fit_group(hsp, soluble):
+    return fit_sphere(hsp, soluble)
+
+def fit_resins(table, n_jobs=None):
+    """Fit one sphere per polymer of a solubility table (columns polymer, solvent, soluble).
+
+    Polymers are fitted in parallel over a process pool. Returns a DataFrame
+    with one row per polymer: centre, R0, misclassifications and fit.
+    """
+    table = table.reset_index(drop=True)
+    hsp = test_hsp(table)
+    groups = list(table.groupby("polymer", sort=False).indices.items())
+    args = [(hsp[rows], table["soluble"].to_numpy(dtype=bool)[rows]) for _, rows in groups]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(args) == 1:
+        fits = [_fit_group(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(args))) as pool:
+            fits = list(pool.map(_fit_group, *zip(*args)))
+    return pd.DataFrame([{"polymer": p, "hsp_d": f["hsp"][0], "hsp_p": f["hsp"][1], "hsp_h": f["hsp"][2],
+                          "r0": f["r0"], "errors": f["errors"], "fit": f["fit"], "n_tests": len(rows)}
+                         for (p, rows), f in zip(groups, fits)])
+
+def save_resins(fits, csv_path=DEFAULT_CSV, db_path=DEFAULT_DB):
+    """Add or replace the fitted polymers in the Resins category and rebuild the database file."""
+    db = read_csv(csv_path)
+    resins = db.setdefault("Resins", {})
+    for f in fits.itertuples(index=False):
+        resins[f.polymer] = {"hsp": [f.hsp_d, f.hsp_p, f.hsp_h], "r0": f.r0}
+    write_csv(db, csv_path)
+    build(csv_path, db_path)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python sphere_fit.py solubility_tests.csv")
+    fits = fit_resins(pd.read_csv(sys.argv[1]))
+    print(fits.to_string(index=False))
+    save_resins(fits)
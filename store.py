@@ -0,0 +1,83 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+# Numeric columns compiled for every category, with the default used when a component lacks the field
+COLUMNS = {"rho": np.nan, "fp": 200.0, "price": 0.0, "eacn": 0.0, "cc": 0.0, "hlb": np.nan, "r0": np.nan}
+FIELDS = ["hsp", *COLUMNS]  # columns of the "present" mask, used to rebuild the original dicts
+EACN_KEY = {"Cosolvents": "f_hld"}  # cosolvents carry their EACN contribution as "f_hld"
+KINDS = [None, "NI", "A"]  # surfactant "type" codes stored in the "kind" column
+
+def ghs_codes(db):
+    """Sorted list of every GHS code used in the database; its order defines the bitmask columns."""
+    return sorted({code for cat in db.values() for c in cat.values() for code in c.get("ghs", [])})
+
+def compile_category(items, codes, cat=None):
+    """Columnar arrays for one category: {name: component dict} -> dict of contiguous arrays."""
+    names = list(items)
+    comps = list(items.values())
+    col = {"names": names, "index": {k: i for i, k in enumerate(names)}, "ids": np.arange(len(names), dtype=np.int32)}
+    col["hsp"] = np.ascontiguousarray([c.get("hsp", [np.nan] * 3) for c in comps], dtype=float).reshape(-1, 3)
+    eacn_key = EACN_KEY.get(cat, "eacn")
+    keys = {f: eacn_key if f == "eacn" else f for f in FIELDS}
+    for key, default in COLUMNS.items():
+        col[key] = np.array([c.get(keys[key], default) for c in comps], dtype=float)
+    col["present"] = np.array([[keys[f] in c for f in FIELDS] for c in comps], dtype=bool).reshape(-1, len(FIELDS))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        col["log_fp"] = np.log10(col["fp"])
+    col["kind"] = np.array([KINDS.index(c.get("type")) for c in comps], dtype=np.int8)
+    col["anionic"] = col["kind"] == KINDS.index("A")
+    col["ghs"] = np.zeros((len(names), len(codes)), dtype=bool)
+    pos = {code: j for j, code in enumerate(codes)}
+    for i, c in enumerate(comps):
+        col["ghs"][i, [pos[code] for code in c.get("ghs", [])]] = True
+    return col
+
+def compile_store(db):
+    """Array-backed view of a DATA_FULL-shaped dict: one compile_category() per category plus the GHS code list."""
+    codes = ghs_codes(db)
+    store = {cat: compile_category(items, codes, cat) for cat, items in db.items()}
+    store["ghs_codes"] = codes
+    return store
+
+def component_dict(store, cat, i):
+    """The component dict of entry `i` of a category, with only the fields it defines.
+
+    Components without GHS codes come back without a "ghs" key; every reader uses c.get("ghs", []).
+    """
+    col, c = store[cat], {}
+    eacn_key = EACN_KEY.get(cat, "eacn")
+    for f, has in zip(FIELDS, col["present"][i]):
+        if not has: continue
+        if f == "hsp": c["hsp"] = col["hsp"][i].tolist()
+        else: c[eacn_key if f == "eacn" else f] = float(col[f][i])
+    if col["ghs"][i].any(): c["ghs"] = [store["ghs_codes"][j] for j in np.flatnonzero(col["ghs"][i])]
+    if col["kind"][i]: c["type"] = KINDS[col["kind"][i]]
+    return c
+
+class CategoryView(Mapping):
+    """Read-only {name: component dict} over one store category; each lookup builds a fresh dict from the arrays."""
+
+    def __init__(self, store, cat):
+        self.store, self.cat = store, cat
+
+    def __getitem__(self, name):
+        return component_dict(self.store, self.cat, self.store[self.cat]["index"][name])
+
+    def __iter__(self):
+        return iter(self.store[self.cat]["names"])
+
+    def __len__(self):
+        return len(self.store[self.cat]["names"])
+
+def store_view(store):
+    """Lazy {category: {name: component dict}} view of a store; the arrays stay where they are (e.g. memory-mapped)."""
+    return {cat: CategoryView(store, cat) for cat in store if cat != "ghs_codes"}
+
+def store_to_dict(store):
+    """Rebuild the nested {category: {name: component dict}} layout as plain dicts."""
+    return {cat: dict(view) for cat, view in store_view(store).items()}
+
+def lookup(store, cat, name):
+    """Integer id of a component in its category."""
+    return store[cat]["index"][name]
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from clp import FLAM_CAT2, FLAM_CAT3
+from engine import evaluate_batch, formulation_index
+
+# --- 1. MESH ---
+# Pseudo-components: oil (solvent + cosolvent), water (aqueous phase) and S-mix (surfactant +
+# cosurfactant), each split at the current formulation's internal ratio. Vertices sit on an
+# integer barycentric lattice of TERNARY_BASE * 2**levels divisions; a triangle is split in
+# four only while its corners fall in different regions.
+TERNARY_BASE = 8
+TERNARY_LEVELS = 6
+REGIONS = {
+    "stability": [0.5, 1.0],               # |HLD| bounds, as in the metrics panel
+    "solubility": [1.0, 1.5],              # RED bounds
+    "flammability": [FLAM_CAT2, FLAM_CAT3],  # flash point: H225 / H226 / not classified
+}
+
+def _base_triangles(base):
+    """(base², 3, 2) integer (oil, water) corners of the uniform triangulation of the simplex."""
+    tris = []
+    for i in range(base):
+        for j in range(base - i):
+            tris.append([(i, j), (i + 1, j), (i, j + 1)])
+            if i + j < base - 1: tris.append([(i + 1, j), (i + 1, j + 1), (i, j + 1)])
+    return np.array(tris, dtype=np.int64)
+
+def _split(tris):
+    """Four children per triangle, through the edge midpoints."""
+    p, q, r = tris[:, 0], tris[:, 1], tris[:, 2]
+    pq, qr, rp = (p + q) // 2, (q + r) // 2, (r + p) // 2
+    return np.concatenate([np.stack(t, axis=1) for t in ([p, pq, rp], [pq, q, qr], [rp, qr, r], [pq, qr, rp])])
+
+def region_codes(red, hld, fp):
+    """Region index per point for each REGIONS property (0 is the best class, 2 the worst; flammability 0 is H225)."""
+    return {"stability": np.digitize(np.abs(hld), REGIONS["stability"]),
+            "solubility": np.digitize(red, REGIONS["solubility"]),
+            "flammability": np.where(np.isfinite(fp), np.digitize(fp, REGIONS["flammability"], right=True), 0)}
+
+# --- 2. DIAGRAM ---
+def pseudo_ternary(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, pcts, salinity, base=TERNARY_BASE, levels=TERNARY_LEVELS):
+    """Adaptive oil / water / S-mix diagram of one component selection.
+
+    `pcts` (PHASES order) fixes the solvent:cosolvent and surfactant:cosurfactant
+    ratios. Each refinement level evaluates only the new vertices in one
+    evaluate_batch call. Returns `points` (a DataFrame of w/w % and model
+    outputs with a column per REGIONS property), `triangles` ((M, 3) rows of
+    `points`, leaves of the mesh, with their `level`) and `n_evals`.
+    """
+    res_idx, idx = formulation_index(res_k, sol_k, cos_k, sur_k, alc_k, wat_k)
+    p_sol, p_cos, p_sur, p_alc = np.asarray(pcts, dtype=float)[:4]
+    f_sol = p_sol / (p_sol + p_cos) if p_sol + p_cos > 0 else 1.0
+    f_sur = p_sur / (p_sur + p_alc) if p_sur + p_alc > 0 else 1.0
+    scale = 2**levels
+    D = base * scale
+
+    keys, cols = np.empty(0, dtype=np.int64), []
+    def evaluate_vertices(v):
+        nonlocal keys
+        k = np.unique(v[:, 0] * (D + 1) + v[:, 1])
+        k = k[~np.isin(k, keys)]
+        if not len(k): return
+        oil, wat = np.divmod(k, D + 1)
+        x_oil, x_wat = oil / D * 100, wat / D * 100
+        x_mix = 100 - x_oil - x_wat
+        w = np.column_stack([x_oil * f_sol, x_oil * (1 - f_sol), x_mix * f_sur, x_mix * (1 - f_sur), x_wat])
+        r = evaluate_batch(w, idx, res_idx, salinity)
+        cols.append(pd.DataFrame({"key": k, "oil": x_oil, "water": x_wat, "smix": x_mix, "red": r["red"], "hld": r["hld"],
+                                  "fp": r["fp"], "rho": r["rho"], "cost": r["cost"], **region_codes(r["red"], r["hld"], r["fp"])}))
+        keys = np.concatenate([keys, k])
+
+    tris, leaves, leaf_level = _base_triangles(base) * scale, [], []
+    for level in range(levels + 1):
+        evaluate_vertices(tris.reshape(-1, 2))
+        pts = pd.concat(cols, ignore_index=True).sort_values("key")
+        pos = np.searchsorted(pts["key"].to_numpy(), tris[..., 0] * (D + 1) + tris[..., 1])
+        code = np.zeros(pos.shape, dtype=np.int64)
+        for prop in REGIONS: code = code * 3 + pts[prop].to_numpy()[pos]
+        mixed = (code != code[:, :1]).any(axis=1)
+        done = ~mixed if level < levels else np.ones(len(tris), dtype=bool)
+        leaves.append(tris[done])
+        leaf_level.append(np.full(done.sum(), level))
+        tris = _split(tris[mixed]) if level < levels else tris[:0]
+
+    points = pd.concat(cols, ignore_index=True).sort_values("key").reset_index(drop=True)
+    leaves = np.concatenate(leaves)
+    triangles = np.searchsorted(points["key"].to_numpy(), leaves[..., 0] * (D + 1) + leaves[..., 1])
+    return {"points": points.drop(columns="key"), "triangles": triangles, "level": np.concatenate(leaf_level),
+            "n_evals": len(points)}
+
+def triangle_regions(diagram, prop):
+    """Region of each leaf triangle for one REGIONS property: the class shared by at least two of its corners
+    (the first corner's when all three differ)."""
+    c = diagram["points"][prop].to_numpy()[diagram["triangles"]]
+    return np.where(c[:, 1] == c[:, 2], c[:, 1], c[:, 0])
@@ -0,0 +1,22 @@
+import numpy as np
+
+from clp import classify_formulation
+from engine import DATA_FULL, PHASES, evaluate, evaluate_components
+
+# Acetone (flash point below 0 °C) selected as cosolvent at 0 %
+KEYS = ("PVC", "Methyl Soyate", "Acetone", "Tween 80", "Butanol", "Pure Water")
+PCTS = [30, 0, 10, 5, 55]
+
+def test_absent_component_does_not_set_flash_point():
+    r = evaluate(*KEYS, *PCTS, 1.0)
+    comps = [DATA_FULL[cat][k] for cat, k in zip(PHASES, KEYS[1:])]
+    single = evaluate_components(comps, KEYS[1:], DATA_FULL["Resins"][KEYS[0]], PCTS, 1.0)
+    assert np.isfinite(r["fp"]) and np.isclose(r["fp"], single["fp"])
+    c = classify_formulation(*KEYS, r["ws"], r["fp"])
+    assert "H225" not in [h for h, _ in c["hazards"]]
+    assert "Flame" not in c["pictograms"]
+
+def test_present_low_flash_point_component_is_h225():
+    r = evaluate(*KEYS, 30, 10, 10, 5, 45, 1.0)
+    c = classify_formulation(*KEYS, r["ws"], r["fp"])
+    assert "H225" in [h for h, _ in c["hazards"]]
@@ -0,0 +1,73 @@
+import numpy as np
+
+from engine import batch_params, evaluate_params, formulation_index
+
+# --- 1. PARAMETER UNCERTAINTY ---
+# {parameter: (distribution, scale)}; "normal" scales are standard deviations, "uniform" ones
+# half-widths. rho, weighing and salinity errors are relative (0.01 = 1 %), the rest absolute:
+# hsp and res_hsp in MPa^0.5 per δ, r0 in MPa^0.5, eacn and cc in HLD units, fp in °C.
+UNCERTAINTY = {
+    "hsp": ("normal", 0.5),
+    "res_hsp": ("normal", 0.5),
+    "r0": ("normal", 0.3),
+    "eacn": ("normal", 0.5),
+    "cc": ("normal", 0.2),
+    "rho": ("normal", 0.01),
+    "fp": ("normal", 3.0),
+    "weighing": ("normal", 0.005),
+    "salinity": ("normal", 0.02),
+}
+DISTRIBUTIONS = ["normal", "uniform"]
+MC_SAMPLES = 100_000
+HLD_WINDOW = 0.5  # |HLD| below this is the stability window of the metrics panel
+CI_LEVEL = 0.95
+OUTPUTS = ["red", "hld", "fp", "rho"]
+
+def _noise(rng, spec, name, shape):
+    dist, scale = spec.get(name, UNCERTAINTY[name])
+    if scale <= 0: return np.zeros(shape)
+    if dist == "uniform": return rng.uniform(-scale, scale, shape)
+    if dist == "normal": return rng.normal(0.0, scale, shape)
+    raise ValueError(f"unknown distribution {dist!r} for {name} (use {' or '.join(DISTRIBUTIONS)})")
+
+def sample_params(idx, res_idx, pcts, salinity, n=MC_SAMPLES, spec=None, seed=0, store=None):
+    """`n` perturbed copies of one formulation's evaluate_params() inputs, plus the weighed
+    percentages and salinity. Zero slots stay zero; weighed amounts are renormalised to 100 %."""
+    spec, rng = spec or {}, np.random.default_rng(seed)
+    b = batch_params(idx, res_idx, 1, store)
+    noisy = lambda key, name, shape: b[key] + _noise(rng, spec, name, shape)
+    fp = 10**b["log_fp"] + _noise(rng, spec, "fp", (n, 5))
+    p = {
+        "rho": b["rho"] * (1 + _noise(rng, spec, "rho", (n, 5))),
+        "log_fp": np.log10(np.maximum(fp, 1.0)),
+        "hsp": noisy("hsp", "hsp", (n, 5, 3)),
+        "price": np.broadcast_to(b["price"], (n, 5)),
+        "res_hsp": noisy("res_hsp", "res_hsp", (n, 3)),
+        "r0": np.maximum(noisy("r0", "r0", n), 0.1),
+        "eacn_sol": noisy("eacn_sol", "eacn", n),
+        "eacn_cos": noisy("eacn_cos", "eacn", n),
+        "anionic": np.broadcast_to(b["anionic"], (n,)),
+        "cc": noisy("cc", "cc", n),
+    }
+    w = np.asarray(pcts, dtype=float) * (1 + _noise(rng, spec, "weighing", (n, 5)))
+    w = 100 * w / w.sum(axis=1, keepdims=True)
+    sal = np.maximum(salinity * (1 + _noise(rng, spec, "salinity", n)), 0.0)
+    return w, sal, p
+
+# --- 2. MONTE CARLO PROPAGATION ---
+def monte_carlo(res_k, sol_k, cos_k, sur_k, alc_k, wat_k, pcts, salinity, n=MC_SAMPLES, spec=None, seed=0):
+    """Propagate parameter and weighing errors through the batch model.
+
+    Returns {output: (mean, ci_low, ci_high)} for RED, HLD, flash point and
+    density at CI_LEVEL, plus the probabilities of |HLD| < HLD_WINDOW
+    (`p_stable`), RED < 1 (`p_soluble`) and both (`p_ok`). A fixed seed keeps
+    reruns of the same formulation identical.
+    """
+    res_idx, idx = formulation_index(res_k, sol_k, cos_k, sur_k, alc_k, wat_k)
+    w, sal, p = sample_params(idx, res_idx, pcts, salinity, n, spec, seed)
+    r = evaluate_params(w, sal, p)
+    tail = 100 * (1 - CI_LEVEL) / 2
+    out = {k: (float(r[k].mean()), *np.percentile(r[k], [tail, 100 - tail]).tolist()) for k in OUTPUTS}
+    stable, soluble = np.abs(r["hld"]) < HLD_WINDOW, r["red"] < 1
+    out.update(p_stable=float(stable.mean()), p_soluble=float(soluble.mean()), p_ok=float((stable & soluble).mean()))
+    return out